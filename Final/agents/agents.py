@@ -1,40 +1,47 @@
 import os
 import json
-import re
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from typing import TypedDict, List
-from neo4j import GraphDatabase
-from langchain_ollama import ChatOllama, OllamaEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
-# ======================================================
-# MODELS
-# ======================================================
-agent_llm = ChatOllama(model="llama3.2:1b", temperature=0)
-answer_llm = ChatOllama(model="llama3.2:1b", temperature=0)
-
-# ======================================================
-# VECTOR STORE
-# ======================================================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CHROMA_DIR = os.path.join(BASE_DIR, "vectorstore", "chroma_amazon_reviews")
-
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
 
-vector_db = Chroma(
-    persist_directory=CHROMA_DIR,
-    embedding_function=embeddings,
-    collection_name="amazon_reviews"
-)
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from offline.versions import read_version
+from cypher_templates import match_template, normalize_question, find_brands, find_limit, find_order
+from cypher_cache import LRUCache
+from answer_cache import SemanticCache
+from reranker import rank_context
+from cypher_params import parameterize
+from cypher_guard import read_session, run_guarded, arun_guarded
+import tracing
+from tracing import span, traced_node
+from context_budget import build_context, budget_docs, supervisor_view
+# warm_up is re-exported for service/api.py and frontend/app.py
+from resources import registry, warm_up  # noqa: F401
 
 # ======================================================
-# NEO4J
+# CLIENTS
 # ======================================================
-driver = GraphDatabase.driver(
-    "bolt://localhost:7687",
-    auth=("neo4j", "Aigurukul@2.0")
-)
+# Built on first use and shared process-wide (see resources.py), so
+# importing this module is cheap and needs no running services.
+# registry.override(name, obj) swaps one out, e.g. for benchmarks.
+agent_llm = registry.lazy("agent_llm")
+answer_llm = registry.lazy("answer_llm")
+embeddings = registry.lazy("embeddings")
+vector_db = registry.lazy("vector_db")
+review_store = registry.lazy("review_store")
+driver = registry.lazy("driver")
+async_driver = registry.lazy("async_driver")
 
 # ======================================================
 # STATE
@@ -42,6 +49,9 @@ driver = GraphDatabase.driver(
 class AgentState(TypedDict):
     query: str
     docs: List[str]
+    graph_docs: List[str]
+    snippets: List[str]
+    cypher: dict
     ranked_docs: List[str]
     answer: str
     validated: bool
@@ -57,17 +67,25 @@ Database Schema:
 (Brand)-[:MAKES]->(Product)
 (Product)-[:HAS_REVIEW]->(Review)
 
-Brand {name}
-Product {name, price}
-Review {rating, votes, text}
+Brand {name, avg_rating, review_count, total_votes, min_price, max_price, product_count}
+Product {name, price, avg_rating, review_count, total_votes, min_price, max_price}
+Review {review_id, rating, votes, price}
 
 Important Rules:
-• rating exists ONLY in Review node (r.rating)
-• Always traverse Product -> Review when using rating
-• Example for average rating:
+• avg_rating, review_count, total_votes, min_price, max_price are PRECOMPUTED
+  on Brand and Product — always use them instead of aggregating reviews
+• Only traverse to Review when individual reviews are needed
+• Example for average rating per brand:
 
-MATCH (b:Brand)-[:MAKES]->(p:Product)-[:HAS_REVIEW]->(r:Review)
-RETURN b.name, AVG(r.rating)
+MATCH (b:Brand)
+RETURN b.name AS brand, b.avg_rating AS avg_rating, b.review_count AS review_count
+ORDER BY avg_rating DESC
+
+• Example for top products of a brand:
+
+MATCH (b:Brand {name: "Samsung"})-[:MAKES]->(p:Product)
+RETURN p.name AS product, p.avg_rating AS avg_rating, p.review_count AS review_count
+ORDER BY avg_rating DESC
 
 • Cypher DOES NOT use GROUP BY
 • Return ONLY Cypher query text
@@ -75,13 +93,28 @@ RETURN b.name, AVG(r.rating)
 • Limit 20
 """
 
-def generate_cypher(question):
-    res = agent_llm.invoke([
+# Normalized question -> (cypher, params) that ran successfully;
+# flushed when offline/load_graph.py reloads the graph
+cypher_cache = LRUCache(max_size=512, ttl=3600, version=lambda: read_version("graph"))
+
+_brand_names = {"loaded": False, "version": None, "names": []}
+
+def known_brands():
+    version = read_version("graph")
+    if not _brand_names["loaded"] or _brand_names["version"] != version:
+        with driver.session() as session:
+            names = [r["name"] for r in session.run("MATCH (b:Brand) RETURN b.name AS name")]
+        _brand_names.update(loaded=True, version=version, names=names)
+    return _brand_names["names"]
+
+def cypher_messages(question):
+    return [
         SystemMessage(content=CYPHER_PROMPT),
         HumanMessage(content=question)
-    ])
+    ]
 
-    text = res.content.replace("```", "").strip()
+def parse_cypher(content):
+    text = content.replace("```", "").strip()
     lines = text.split("\n")
 
     clean = []
@@ -92,32 +125,80 @@ def generate_cypher(question):
         if started:
             clean.append(l)
 
-    cypher = "\n".join(clean).strip()
-    if not cypher:
-        cypher = "MATCH (n) RETURN n LIMIT 5"
+    # Empty output is rejected by the cost guard → vector-only retrieval
+    return "\n".join(clean).strip()
 
-    return cypher
+def fast_cypher(question, brands):
+    template = match_template(question, brands)
+    if template:
+        return template[0], template[1], "template"
 
-def run_cypher(query):
-    query = query.replace("GROUP BY", "").replace("group by", "")
+    cached = cypher_cache.get(normalize_question(question))
+    if cached:
+        return cached[0], cached[1], "cache"
+    return None
 
-    try:
-        with driver.session() as session:
-            result = session.run(query)
-            rows = []
+def llm_plan(content):
+    # LLM Cypher inlines literals; lift them into $params so Neo4j can
+    # reuse the plan for every query with the same shape
+    cypher, params = parameterize(parse_cypher(content))
+    return cypher, params, "llm"
 
-            for r in result:
-                d = dict(r)
-                brand = d.get("b.name") or d.get("brand")
-                rating = d.get("AVG(r.rating)") or d.get("avg_rating")
+def generate_cypher(question):
+    # Returns (cypher, params, source); source is "template", "cache" or "llm"
+    try:
+        brands = known_brands()
+    except Exception as e:
+        print("Brand lookup failed → skipping templates:", e)
+        brands = []
+
+    plan = fast_cypher(question, brands)
+    if plan is None:
+        res = agent_llm.invoke(cypher_messages(question))
+        plan = llm_plan(res.content)
+    return plan
+
+def format_row(d):
+    brand = d.get("brand") or d.get("b.name")
+    product = d.get("product") or d.get("p.name")
+    rating = next((d[k] for k in (
+        "avg_rating", "b.avg_rating", "p.avg_rating", "AVG(r.rating)"
+    ) if d.get(k) is not None), None)
+    count = d.get("review_count") or d.get("b.review_count") or d.get("p.review_count")
+
+    subject = f"Product {product}" if product else f"Brand {brand}" if brand else None
+    if subject and isinstance(d.get("min_price"), (int, float)):
+        text = f"{subject} prices range from {d['min_price']} to {d.get('max_price')}"
+        if d.get("product_count"):
+            text += f" across {d['product_count']} products"
+        return text
+    if not subject or not isinstance(rating, (int, float)):
+        return str(d)
+
+    text = f"{subject} has average rating {round(rating, 2)}"
+    if count:
+        text += f" from {count} reviews"
+    if product and brand:
+        text += f" (brand {brand})"
+    return text
+
+def execute_cypher(query, params=None, session=None):
+    # Raises CypherRejected when the cost guard refuses the query
+    query = query.replace("GROUP BY", "").replace("group by", "")
 
-                if brand and rating:
-                    rows.append(f"Brand {brand} has average rating {rating}")
-                else:
-                    rows.append(str(d))
+    with span("neo4j.query", kind="neo4j", cypher=query, params=params) as s:
+        if session is not None:
+            records = run_guarded(session, query, params)
+        else:
+            with read_session(driver) as session:
+                records = run_guarded(session, query, params)
+        s["attrs"]["rows"] = len(records)
 
-            return rows
+    return [format_row(dict(r)) for r in records]
 
+def run_cypher(query, params=None):
+    try:
+        return execute_cypher(query, params)
     except Exception as e:
         print("Cypher failed → fallback to vector retrieval:", e)
         return []
@@ -126,18 +207,108 @@ def run_cypher(query):
 # ======================================================
 # RETRIEVE
 # ======================================================
+def format_vector_doc(d):
+    review = review_store.get(d.metadata["review_id"])
+    # The store is addressed by position; a record for another review means
+    # it was built from different cleaned data, so fall back to the chunk
+    if review is None or (review["brand"], review["product"]) != (d.metadata["brand"], d.metadata["product"]):
+        return f"Brand:{d.metadata['brand']} Product:{d.metadata['product']} Review:{d.page_content}"
+
+    price = f" Price:{review['price']}" if review["price"] is not None else ""
+    return (
+        f"Brand:{review['brand']} Product:{review['product']} "
+        f"Rating:{review['rating']} Votes:{review['votes']}{price} "
+        f"Review:{review['review_text']}"
+    )
+
+# Per-branch budgets (seconds), counted from when the branch starts
+# running; a late branch is dropped, not awaited
+GRAPH_TIMEOUT = 30
+VECTOR_TIMEOUT = 10
+# Review chunks fetched per query; all of them go to the ranker, which
+# keeps RANK_TOP_K (at least RANK_MIN_DOCS reviews)
+VECTOR_K = 5
+
+# One pool per branch, sized for the expected concurrent sessions: a slow
+# LLM Cypher generation then never queues a fast Chroma search behind it
+RETRIEVAL_WORKERS = int(os.getenv("RAG_RETRIEVAL_WORKERS", "8"))
+graph_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieve-graph")
+vector_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieve-vector")
+
+def cypher_trace(cypher, params, source, rows=None, error=None):
+    return {
+        "query": cypher,
+        "params": params,
+        "source": source,
+        "rows": None if rows is None else len(rows),
+        "error": None if error is None else str(error)
+    }
+
+def graph_branch(query):
+    # Returns (rows, cypher trace)
+    with span("cypher.plan") as s:
+        cypher, params, source = generate_cypher(query)
+        s["attrs"]["source"] = source
+    try:
+        rows = execute_cypher(cypher, params)
+    except Exception as e:
+        print("Cypher failed → fallback to vector retrieval:", e)
+        return [], cypher_trace(cypher, params, source, error=e)
+
+    # Only Cypher that actually ran is worth reusing
+    if source == "llm":
+        cypher_cache.put(normalize_question(query), (cypher, params))
+    return rows, cypher_trace(cypher, params, source, rows)
+
+def vector_branch(query):
+    # (doc shown to the LLM, chunk text that was embedded for it)
+    with span("chroma.search", kind="chroma", k=VECTOR_K) as s:
+        vec = vector_db.similarity_search(query, k=VECTOR_K)
+        s["attrs"]["hits"] = len(vec)
+    return [(format_vector_doc(d), d.page_content) for d in vec]
+
+def _submit_branch(pool, func, query):
+    # Returns (future, started); started is set once a worker picks the
+    # branch up, so time spent queued does not count against its budget.
+    # copy_context carries the active trace into the pool thread.
+    started = threading.Event()
+
+    def run():
+        started.at = time.monotonic()
+        started.set()
+        return func(query)
+
+    return pool.submit(contextvars.copy_context().run, run), started
+
+def _branch_result(name, branch, timeout, default):
+    future, started = branch
+    try:
+        # Bound the queue wait by the same budget; a branch that never got
+        # a worker can still be cancelled
+        if not started.wait(timeout):
+            future.cancel()
+            raise FutureTimeout()
+        return future.result(timeout=max(started.at + timeout - time.monotonic(), 0))
+    except FutureTimeout:
+        # A running branch cannot be interrupted; it finishes in the
+        # background on its own pool and the result is discarded
+        print(f"{name} retrieval timed out → continuing without it")
+    except Exception as e:
+        print(f"{name} retrieval failed → continuing without it:", e)
+    return default
+
 def retrieve_node(state):
-    cypher = generate_cypher(state["query"])
-    graph_docs = run_cypher(cypher)
+    # The vector search does not depend on the Cypher path, so both
+    # branches run side by side and the slower one sets the latency
+    graph = _submit_branch(graph_pool, graph_branch, state["query"])
+    vector = _submit_branch(vector_pool, vector_branch, state["query"])
 
-    vec = vector_db.similarity_search(state["query"], k=5)
-    vec_docs = [
-        f"Brand:{d.metadata['brand']} Product:{d.metadata['product']} Review:{d.page_content}"
-        for d in vec
-    ]
+    vec_hits = _branch_result("Vector", vector, VECTOR_TIMEOUT, [])
+    graph_docs, cypher = _branch_result("Graph", graph, GRAPH_TIMEOUT, ([], {}))
 
-    docs = graph_docs + vec_docs[:3]
-    return { "docs": docs}
+    docs = graph_docs + [doc for doc, _ in vec_hits]
+    snippets = graph_docs + [chunk for _, chunk in vec_hits]
+    return { "docs": docs, "graph_docs": graph_docs, "snippets": snippets, "cypher": cypher}
 
 
 # ======================================================
@@ -162,23 +333,59 @@ Return strictly JSON:
 }
 """
 
+# "local": NumPy cosine + BM25 reranker, "llm": RankerAgent prompt
+RANKER = os.getenv("RANKER", "local")
+RANK_TOP_K = 5
+# Reviews kept next to graph rows even when those fill RANK_TOP_K
+RANK_MIN_DOCS = 2
+
+def local_rank_node(state):
+    docs = state["docs"]
+    snippets = state.get("snippets") or docs
+    graph_docs = set(state.get("graph_docs") or [])
+
+    graph_rows = [doc for doc in docs if doc in graph_docs]
+    vector = [(doc, snip) for doc, snip in zip(docs, snippets) if doc not in graph_docs]
+
+    # Only vector chunks are embedded: build_chroma.py already cached them
+    # and the vector search cached the query, so these are cache hits.
+    # Graph rows are never embedded (each would be a fresh Ollama call).
+    query_vector = embeddings.embed_query(state["query"])
+    doc_vectors = embeddings.embed_documents([snip for _, snip in vector]) if vector else []
+
+    ranked = rank_context(
+        state["query"], graph_rows,
+        [doc for doc, _ in vector], [snip for _, snip in vector],
+        query_vector, doc_vectors, top_k=RANK_TOP_K, min_docs=RANK_MIN_DOCS
+    )
+    return {"ranked_docs": ranked}
+
 def rank_node(state):
+    if RANKER == "local":
+        return local_rank_node(state)
+    return llm_rank_node(state)
 
-    response = agent_llm.invoke([
+def rank_messages(state):
+    return [
         SystemMessage(content=RANK_PROMPT),
         HumanMessage(content=json.dumps({
             "user_query": state["query"],
-            "retrieved_context": state["docs"]
+            "retrieved_context": budget_docs(state["docs"], state.get("graph_docs"), "rank")
         }))
-    ])
+    ]
 
+def parse_rank(content, state):
     try:
-        ranked = json.loads(response.content)["top_context"]
+        ranked = json.loads(content)["top_context"]
     except:
-        ranked = state["docs"][:5]
+        ranked = state["docs"][:RANK_TOP_K]
 
     return {"ranked_docs": ranked}
 
+def llm_rank_node(state):
+    response = agent_llm.invoke(rank_messages(state))
+    return parse_rank(response.content, state)
+
 
 
 # ======================================================
@@ -200,17 +407,22 @@ Rules:
 """
 
 
-def answer_node(state):
-
-    res = answer_llm.invoke([
+def answer_messages(state):
+    # Plain text rather than JSON: escaped newlines and quotes cost tokens
+    context = build_context(state["ranked_docs"], state.get("graph_docs"), "answer")
+    return [
         SystemMessage(content=ANSWER_PROMPT),
-        HumanMessage(content=json.dumps({
-            "query": state["query"],
-            "context": state["ranked_docs"]
-        }))
-    ])
+        HumanMessage(content=f"Query: {state['query']}\n\nContext:\n{context}")
+    ]
+
+def answer_node(state, config=None):
+    # Streamed so app.stream(stream_mode="messages") can forward tokens
+    # to the UI while the answer is still being generated
+    tokens = []
+    for chunk in answer_llm.stream(answer_messages(state), config=config):
+        tokens.append(chunk.content)
 
-    return {"answer": res.content}
+    return {"answer": "".join(tokens)}
 
 # ======================================================
 # CRITIC
@@ -220,20 +432,24 @@ Check if answer is grounded in context.
 Return JSON {"valid":true/false}
 """
 
-def critic_node(state):
-    res = agent_llm.invoke([
+def critic_messages(state):
+    context = build_context(state["ranked_docs"], state.get("graph_docs"), "critic")
+    return [
         SystemMessage(content=CRITIC_PROMPT),
-        HumanMessage(content=json.dumps({
-            "answer": state["answer"],
-            "context": state["ranked_docs"]
-        }))
-    ])
+        HumanMessage(content=f"Answer:\n{state['answer']}\n\nContext:\n{context}")
+    ]
+
+def parse_critic(content):
     try:
-        valid = json.loads(res.content)["valid"]
+        valid = json.loads(content)["valid"]
     except:
         valid = True
     return {"validated": valid}
 
+def critic_node(state):
+    res = agent_llm.invoke(critic_messages(state))
+    return parse_critic(res.content)
+
 
 # ======================================================
 # RECOMMENDATION
@@ -253,16 +469,17 @@ Rules:
 Return only the question text
 """
 
-def recommendation_node(state):
-
-    res = agent_llm.invoke([
+def recommend_messages(state):
+    return [
         SystemMessage(content=RECOMMEND_PROMPT),
         HumanMessage(content=json.dumps({
             "user_query": state["query"],
             "answer": state["answer"]
         }))
-    ])
+    ]
 
+def recommendation_node(state):
+    res = agent_llm.invoke(recommend_messages(state))
     return {"recommendation": res.content}
 
 
@@ -290,80 +507,317 @@ Decide the BEST next agent based on:
 Return JSON:
 {"next":"agent_name"}
 """
-def supervisor_router(state):
-
-    # ---------- Mandatory progress guards ----------
-    if not state.get("docs"):
-        return "retrieve"
-
-    if not state.get("ranked_docs"):
-        return "rank"
-
-    if not state.get("answer"):
-        return "answer"
+# The fixed edges below already guarantee progress through every agent,
+# so asking the LLM what to do after completion is opt-in only
+USE_LLM_SUPERVISOR = os.getenv("USE_LLM_SUPERVISOR", "0") == "1"
+# Agents the supervisor may restart from. Each reaches the critic/recommend
+# fan-out through answer, so the finish join fires again; critic or
+# recommend alone would leave the join waiting for the other branch.
+SUPERVISOR_ROUTES = ("retrieve", "rank", "answer")
 
-    if not state.get("validated"):
-        return "critic"
-
-    if not state.get("recommendation"):
-        return "recommend"
+def supervisor_router(state):
 
     # ---------- Dynamic reasoning after completion ----------
     res = agent_llm.invoke([
         SystemMessage(content=SUPERVISOR_PROMPT),
-        HumanMessage(content=json.dumps(state))
+        HumanMessage(content=supervisor_view(state))
     ])
 
     try:
-        return json.loads(res.content)["next"]
+        nxt = json.loads(res.content)["next"]
     except:
         return "end"
+    return nxt if nxt in SUPERVISOR_ROUTES else "end"
+
+
+def finish_node(state):
+    # Join point for the parallel critic/recommend branch
+    return {}
+
+
+# ======================================================
+# ASYNC NODES (used by app.ainvoke / app.astream)
+# ======================================================
+async def aexecute_cypher(query, params=None):
+    query = query.replace("GROUP BY", "").replace("group by", "")
+
+    with span("neo4j.query", kind="neo4j", cypher=query, params=params) as s:
+        async with read_session(async_driver) as session:
+            records = await arun_guarded(session, query, params)
+        s["attrs"]["rows"] = len(records)
+
+    return [format_row(dict(r)) for r in records]
+
+async def agraph_branch(query):
+    try:
+        brands = await asyncio.to_thread(known_brands)
+    except Exception as e:
+        print("Brand lookup failed → skipping templates:", e)
+        brands = []
 
+    with span("cypher.plan") as s:
+        plan = fast_cypher(query, brands)
+        if plan is None:
+            res = await agent_llm.ainvoke(cypher_messages(query))
+            plan = llm_plan(res.content)
+        cypher, params, source = plan
+        s["attrs"]["source"] = source
+
+    try:
+        rows = await aexecute_cypher(cypher, params)
+    except Exception as e:
+        print("Cypher failed → fallback to vector retrieval:", e)
+        return [], cypher_trace(cypher, params, source, error=e)
+
+    if source == "llm":
+        cypher_cache.put(normalize_question(query), (cypher, params))
+    return rows, cypher_trace(cypher, params, source, rows)
+
+async def _abranch_result(name, coro, timeout, default):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        print(f"{name} retrieval timed out → continuing without it")
+    except Exception as e:
+        print(f"{name} retrieval failed → continuing without it:", e)
+    return default
+
+async def aretrieve_node(state):
+    (graph_docs, cypher), vec_hits = await asyncio.gather(
+        _abranch_result("Graph", agraph_branch(state["query"]), GRAPH_TIMEOUT, ([], {})),
+        _abranch_result("Vector", asyncio.to_thread(vector_branch, state["query"]), VECTOR_TIMEOUT, [])
+    )
+
+    docs = graph_docs + [doc for doc, _ in vec_hits]
+    snippets = graph_docs + [chunk for _, chunk in vec_hits]
+    return { "docs": docs, "graph_docs": graph_docs, "snippets": snippets, "cypher": cypher}
+
+async def arank_node(state):
+    if RANKER == "local":
+        return await asyncio.to_thread(local_rank_node, state)
+    response = await agent_llm.ainvoke(rank_messages(state))
+    return parse_rank(response.content, state)
+
+async def aanswer_node(state, config=None):
+    tokens = []
+    async for chunk in answer_llm.astream(answer_messages(state), config=config):
+        tokens.append(chunk.content)
+
+    return {"answer": "".join(tokens)}
+
+async def acritic_node(state):
+    res = await agent_llm.ainvoke(critic_messages(state))
+    return parse_critic(res.content)
+
+async def arecommendation_node(state):
+    res = await agent_llm.ainvoke(recommend_messages(state))
+    return {"recommendation": res.content}
 
 
 # ======================================================
 # WORKFLOW
 # ======================================================
-workflow = StateGraph(AgentState)
+def build_workflow(use_llm_supervisor=USE_LLM_SUPERVISOR):
+    workflow = StateGraph(AgentState)
 
-workflow.add_node("retrieve", retrieve_node)
-workflow.add_node("rank", rank_node)
-workflow.add_node("answer", answer_node)
-workflow.add_node("critic", critic_node)
-workflow.add_node("recommend", recommendation_node)
+    # Each node has a sync body for app.invoke and an async one for ainvoke,
+    # both wrapped in a tracing span
+    workflow.add_node("retrieve", RunnableLambda(traced_node("retrieve", retrieve_node), afunc=traced_node("retrieve", aretrieve_node)))
+    workflow.add_node("rank", RunnableLambda(traced_node("rank", rank_node), afunc=traced_node("rank", arank_node)))
+    workflow.add_node("answer", RunnableLambda(traced_node("answer", answer_node), afunc=traced_node("answer", aanswer_node)))
+    workflow.add_node("critic", RunnableLambda(traced_node("critic", critic_node), afunc=traced_node("critic", acritic_node)))
+    workflow.add_node("recommend", RunnableLambda(traced_node("recommend", recommendation_node), afunc=traced_node("recommend", arecommendation_node)))
+    workflow.add_node("finish", finish_node)
 
-workflow.set_entry_point("retrieve")
+    workflow.set_entry_point("retrieve")
 
-workflow.add_conditional_edges(
-    "retrieve",
-    supervisor_router,
-    {"retrieve":"retrieve","rank":"rank","answer":"answer","critic":"critic","recommend":"recommend","end":END}
-)
+    workflow.add_edge("retrieve", "rank")
+    workflow.add_edge("rank", "answer")
 
-workflow.add_conditional_edges(
-    "rank",
-    supervisor_router,
-    {"retrieve":"retrieve","rank":"rank","answer":"answer","critic":"critic","recommend":"recommend","end":END}
-)
+    # critic and recommend only read the answer and context: fan out
+    # after answer and join before finishing
+    workflow.add_edge("answer", "critic")
+    workflow.add_edge("answer", "recommend")
+    workflow.add_edge(["critic", "recommend"], "finish")
 
-workflow.add_conditional_edges(
-    "answer",
-    supervisor_router,
-    {"retrieve":"retrieve","rank":"rank","answer":"answer","critic":"critic","recommend":"recommend","end":END}
-)
+    if use_llm_supervisor:
+        workflow.add_conditional_edges(
+            "finish",
+            traced_node("supervisor", supervisor_router),
+            {**{name: name for name in SUPERVISOR_ROUTES}, "end": END}
+        )
+    else:
+        workflow.add_edge("finish", END)
+
+    return workflow
 
-workflow.add_conditional_edges(
-    "critic",
-    supervisor_router,
-    {"retrieve":"retrieve","rank":"rank","answer":"answer","critic":"critic","recommend":"recommend","end":END}
-)
 
-workflow.add_conditional_edges(
-    "recommend",
-    supervisor_router,
-    {"end":END}
+workflow = build_workflow()
+
+app = workflow.compile()
+
+
+# ======================================================
+# SEMANTIC ANSWER CACHE
+# ======================================================
+# Cosine similarity above which two questions share an answer
+ANSWER_CACHE_THRESHOLD = 0.92
+ANSWER_CACHE_SIZE = 1000
+
+# Flushed whenever Neo4j or Chroma/review store data is rebuilt
+answer_cache = SemanticCache(
+    threshold=ANSWER_CACHE_THRESHOLD,
+    max_size=ANSWER_CACHE_SIZE,
+    version=lambda: (read_version("graph"), read_version("vector"))
 )
 
+def query_signature(query):
+    # Cache hits also need the same brands, limit and sort direction
+    try:
+        brands = known_brands()
+    except Exception as e:
+        print("Brand lookup failed → signature without brands:", e)
+        brands = []
+    return tuple(sorted(find_brands(query, brands))), find_limit(query), find_order(query)
+
+def initial_state(query):
+    return {
+        "query": query,
+        "docs": [],
+        "graph_docs": [],
+        "snippets": [],
+        "cypher": {},
+        "ranked_docs": [],
+        "answer": "",
+        "validated": False,
+        "recommendation": ""
+    }
+
+def trace_config(trace):
+    # Nodes pick the trace up from here (see tracing.traced_node)
+    return {"configurable": {"trace": trace}}
+
+# A failed embedding (e.g. Ollama's embed endpoint down) only costs the
+# cache: the request runs uncached and its answer is not stored. The
+# vector branch of retrieve handles the same failure on its own.
+CACHE_SKIPPED = (None, None, None)
+
+def _embed_and_lookup(trace, query):
+    try:
+        with tracing.activate(trace):
+            with span("embed_query", kind="embedding"):
+                embedding = embeddings.embed_query(query)
+            with span("answer_cache.lookup") as s:
+                signature = query_signature(query)
+                cached = answer_cache.lookup(embedding, signature)
+                s["attrs"]["hit"] = cached is not None
+    except Exception as e:
+        print("Answer cache skipped:", e)
+        return CACHE_SKIPPED
+    return embedding, signature, cached
 
+async def _aembed_and_lookup(trace, query):
+    try:
+        with tracing.activate(trace):
+            with span("embed_query", kind="embedding"):
+                embedding = await embeddings.aembed_query(query)
+            with span("answer_cache.lookup") as s:
+                signature = await asyncio.to_thread(query_signature, query)
+                cached = answer_cache.lookup(embedding, signature)
+                s["attrs"]["hit"] = cached is not None
+    except Exception as e:
+        print("Answer cache skipped:", e)
+        return CACHE_SKIPPED
+    return embedding, signature, cached
+
+def run_pipeline(query):
+    # The query embedding is also reused (via the embedding cache) by
+    # the vector search inside retrieve_node. The returned state carries
+    # a "timings" summary of this request's trace.
+    trace = tracing.new_trace(query)
+    try:
+        embedding, signature, cached = _embed_and_lookup(trace, query)
+        if cached is not None:
+            result = {**cached, "query": query, "cached": True}
+        else:
+            result = app.invoke(initial_state(query), config=trace_config(trace))
+            if embedding is not None and result.get("answer"):
+                answer_cache.store(embedding, result, signature)
+    except Exception as e:
+        tracing.end_trace(trace, error=e)
+        raise
+    return {**result, "timings": tracing.end_trace(trace)}
 
-app = workflow.compile()
+async def arun_pipeline(query):
+    trace = tracing.new_trace(query)
+    try:
+        embedding, signature, cached = await _aembed_and_lookup(trace, query)
+        if cached is not None:
+            result = {**cached, "query": query, "cached": True}
+        else:
+            result = await app.ainvoke(initial_state(query), config=trace_config(trace))
+            if embedding is not None and result.get("answer"):
+                answer_cache.store(embedding, result, signature)
+    except Exception as e:
+        tracing.end_trace(trace, error=e)
+        raise
+    return {**result, "timings": tracing.end_trace(trace)}
+
+def stream_pipeline(query):
+    # Yields ("token", text) while answer_node generates, ("node", name)
+    # as each agent finishes, and finally ("result", final_state)
+    trace = tracing.new_trace(query)
+    try:
+        embedding, signature, cached = _embed_and_lookup(trace, query)
+        if cached is not None:
+            yield "token", cached["answer"]
+            result = {**cached, "query": query, "cached": True}
+        else:
+            result = initial_state(query)
+            for mode, payload in app.stream(
+                initial_state(query), config=trace_config(trace), stream_mode=["messages", "updates"]
+            ):
+                if mode == "messages":
+                    chunk, meta = payload
+                    if meta.get("langgraph_node") == "answer" and chunk.content:
+                        yield "token", chunk.content
+                else:
+                    for node, update in payload.items():
+                        result.update(update or {})
+                        yield "node", node
+
+            if embedding is not None and result.get("answer"):
+                answer_cache.store(embedding, result, signature)
+    except BaseException as e:
+        tracing.end_trace(trace, error=e)
+        raise
+    yield "result", {**result, "timings": tracing.end_trace(trace)}
+
+async def astream_pipeline(query):
+    # Async twin of stream_pipeline for the HTTP service
+    trace = tracing.new_trace(query)
+    try:
+        embedding, signature, cached = await _aembed_and_lookup(trace, query)
+        if cached is not None:
+            yield "token", cached["answer"]
+            result = {**cached, "query": query, "cached": True}
+        else:
+            result = initial_state(query)
+            async for mode, payload in app.astream(
+                initial_state(query), config=trace_config(trace), stream_mode=["messages", "updates"]
+            ):
+                if mode == "messages":
+                    chunk, meta = payload
+                    if meta.get("langgraph_node") == "answer" and chunk.content:
+                        yield "token", chunk.content
+                else:
+                    for node, update in payload.items():
+                        result.update(update or {})
+                        yield "node", node
+
+            if embedding is not None and result.get("answer"):
+                answer_cache.store(embedding, result, signature)
+    except BaseException as e:
+        tracing.end_trace(trace, error=e)
+        raise
+    yield "result", {**result, "timings": tracing.end_trace(trace)}
@@ -0,0 +1,88 @@
+#answer_cache.py
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class SemanticCache:
+    # Maps query embeddings to finished pipeline results. A lookup hits
+    # when the closest stored query is within `threshold` cosine
+    # similarity and was stored under the same signature (entities, limit,
+    # sort order): near-identical wording like "top Samsung phones" vs
+    # "top Nokia phones" embeds too closely for the threshold alone.
+    # Least-recently-used entries are evicted past max_size, and
+    # everything is flushed when the data version changes.
+
+    def __init__(self, threshold=0.92, max_size=1000, version=None):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.version = version or (lambda: None)
+        self._lock = threading.Lock()
+        self._seen_version = self.version()
+        self._entries = OrderedDict()   # key -> result
+        self._keys = []                 # row -> key
+        self._signatures = []           # row -> signature
+        self._matrix = None             # normalized embeddings, one per row
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        current = self.version()
+        if current != self._seen_version:
+            self._clear()
+            self._seen_version = current
+
+    def _clear(self):
+        self._entries.clear()
+        self._keys = []
+        self._signatures = []
+        self._matrix = None
+
+    @staticmethod
+    def _normalize(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, embedding, signature=None):
+        with self._lock:
+            self._check_version()
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            sims = self._matrix @ self._normalize(embedding)
+            same = np.fromiter((sig == signature for sig in self._signatures), dtype=bool, count=len(sims))
+            sims = np.where(same, sims, -np.inf)
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def store(self, embedding, result, signature=None):
+        with self._lock:
+            self._check_version()
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = result
+            self._keys.append(key)
+            self._signatures.append(signature)
+
+            row = self._normalize(embedding)[None, :]
+            self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+
+            if len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                i = self._keys.index(evicted)
+                del self._keys[i]
+                del self._signatures[i]
+                self._matrix = np.delete(self._matrix, i, axis=0)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
@@ -0,0 +1,218 @@
+#batch.py
+import sys
+import json
+import time
+from agents import (
+    agent_llm,
+    answer_llm,
+    embeddings,
+    vector_db,
+    driver,
+    answer_cache,
+    cypher_cache,
+    RANKER,
+    RANK_TOP_K,
+    VECTOR_K,
+    known_brands,
+    fast_cypher,
+    cypher_messages,
+    llm_plan,
+    cypher_trace,
+    execute_cypher,
+    format_vector_doc,
+    local_rank_node,
+    rank_messages,
+    parse_rank,
+    answer_messages,
+    critic_messages,
+    parse_critic,
+    recommend_messages,
+    initial_state,
+    query_signature,
+)
+from cypher_templates import normalize_question
+from cypher_guard import read_session
+
+# Queries pushed through each stage together; records stream out per chunk
+BATCH_SIZE = 32
+# Parallel LLM requests per .batch call (match OLLAMA_NUM_PARALLEL)
+MAX_CONCURRENCY = 4
+
+def _llm_batch(llm, prompts, max_concurrency):
+    # A failed call comes back as its exception, so one bad query does
+    # not abort the rest of the chunk
+    if not prompts:
+        return []
+    return llm.batch(prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+
+def _fail(state, stage, error):
+    print(f"{stage} failed for {state['query']!r}:", error, file=sys.stderr)
+    state.setdefault("error", f"{stage}: {error}")
+
+def _search(state, vector):
+    # Same fallback as retrieve_node: a failed vector search only loses
+    # the review context
+    try:
+        if vector is None:
+            return vector_db.similarity_search(state["query"], k=VECTOR_K)
+        return vector_db.similarity_search_by_vector(vector, k=VECTOR_K)
+    except Exception as e:
+        print("Vector retrieval failed → continuing without it:", e, file=sys.stderr)
+        return []
+
+def run_chunk(queries, max_concurrency=MAX_CONCURRENCY):
+    states = [initial_state(q) for q in queries]
+
+    # ---------- one embedding call for every query ----------
+    try:
+        vectors = embeddings.embed_documents(queries)
+    except Exception as e:
+        # No vectors: skip the answer cache and search by text instead
+        print("Batch embedding failed → answer cache skipped:", e, file=sys.stderr)
+        vectors = [None] * len(queries)
+
+    pending = []
+    for state, vector in zip(states, vectors):
+        state["signature"] = query_signature(state["query"])
+        cached = answer_cache.lookup(vector, state["signature"]) if vector is not None else None
+        if cached is not None:
+            state.update({**cached, "query": state["query"], "cached": True})
+        else:
+            pending.append((state, vector))
+    if not pending:
+        return states
+
+    # ---------- Cypher: templates/cache first, LLM batch for the rest ----------
+    try:
+        brands = known_brands()
+    except Exception as e:
+        print("Brand lookup failed → skipping templates:", e, file=sys.stderr)
+        brands = []
+
+    plans = [fast_cypher(state["query"], brands) for state, _ in pending]
+    need_llm = [i for i, plan in enumerate(plans) if plan is None]
+    responses = _llm_batch(
+        agent_llm, [cypher_messages(pending[i][0]["query"]) for i in need_llm], max_concurrency
+    )
+    for i, res in zip(need_llm, responses):
+        try:
+            if isinstance(res, Exception):
+                raise res
+            plans[i] = llm_plan(res.content)
+        except Exception as e:
+            # Like a failed graph branch: answer from reviews alone
+            print("Cypher generation failed → fallback to vector retrieval:", e, file=sys.stderr)
+            plans[i] = (None, {}, "llm", e)
+
+    # ---------- graph rows over one shared session ----------
+    graph_rows = []
+    with read_session(driver) as session:
+        for (state, _), (cypher, params, source, *failed) in zip(pending, plans):
+            if failed:
+                state["cypher"] = cypher_trace(cypher, params, source, error=failed[0])
+                graph_rows.append([])
+                continue
+            try:
+                rows = execute_cypher(cypher, params, session=session)
+                if source == "llm":
+                    cypher_cache.put(normalize_question(state["query"]), (cypher, params))
+                state["cypher"] = cypher_trace(cypher, params, source, rows)
+            except Exception as e:
+                print("Cypher failed → fallback to vector retrieval:", e, file=sys.stderr)
+                rows = []
+                state["cypher"] = cypher_trace(cypher, params, source, error=e)
+            graph_rows.append(rows)
+
+    # ---------- vector search reusing the batch embeddings ----------
+    for (state, vector), graph_docs in zip(pending, graph_rows):
+        hits = _search(state, vector)
+        state["graph_docs"] = graph_docs
+        state["docs"] = graph_docs + [format_vector_doc(d) for d in hits]
+        state["snippets"] = graph_docs + [d.page_content for d in hits]
+
+    # ---------- rank ----------
+    if RANKER == "local":
+        for state, _ in pending:
+            try:
+                state.update(local_rank_node(state))
+            except Exception as e:
+                print("Ranking failed → keeping retrieval order:", e, file=sys.stderr)
+                state["ranked_docs"] = state["docs"][:RANK_TOP_K]
+    else:
+        responses = _llm_batch(agent_llm, [rank_messages(s) for s, _ in pending], max_concurrency)
+        for (state, _), res in zip(pending, responses):
+            # parse_rank falls back to retrieval order on unusable output
+            state.update(parse_rank(None if isinstance(res, Exception) else res.content, state))
+
+    # ---------- answer ----------
+    responses = _llm_batch(answer_llm, [answer_messages(s) for s, _ in pending], max_concurrency)
+    for (state, _), res in zip(pending, responses):
+        if isinstance(res, Exception):
+            _fail(state, "answer", res)
+        else:
+            state["answer"] = res.content
+    # Nothing to validate or recommend without an answer
+    pending = [(state, vector) for state, vector in pending if "error" not in state]
+
+    # ---------- critic + recommend in one batch ----------
+    prompts = [critic_messages(s) for s, _ in pending] + [recommend_messages(s) for s, _ in pending]
+    responses = _llm_batch(agent_llm, prompts, max_concurrency)
+    n = len(pending)
+    for (state, vector), critic, rec in zip(pending, responses[:n], responses[n:]):
+        for stage, res in (("critic", critic), ("recommend", rec)):
+            if isinstance(res, Exception):
+                _fail(state, stage, res)
+        if not isinstance(critic, Exception):
+            state.update(parse_critic(critic.content))
+        if not isinstance(rec, Exception):
+            state["recommendation"] = rec.content
+        # Only complete results are worth replaying
+        if state["answer"] and vector is not None and "error" not in state:
+            answer_cache.store(vector, dict(state), state["signature"])
+
+    return states
+
+def run_batch(queries, batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY):
+    # Yields one record per query, in input order, chunk by chunk
+    for start in range(0, len(queries), batch_size):
+        chunk = queries[start:start + batch_size]
+        started = time.perf_counter()
+        try:
+            states = run_chunk(chunk, max_concurrency)
+        except Exception as e:
+            # Unexpected failure: report the chunk and move on to the next
+            print("Chunk failed:", e, file=sys.stderr)
+            states = [{**initial_state(q), "error": str(e)} for q in chunk]
+        elapsed = time.perf_counter() - started
+
+        for state in states:
+            yield {
+                "query": state["query"],
+                "answer": state.get("answer", ""),
+                "recommendation": state.get("recommendation", ""),
+                "validated": state.get("validated"),
+                "cached": state.get("cached", False),
+                "context": state.get("ranked_docs", []),
+                "cypher": state.get("cypher", {}),
+                "error": state.get("error"),
+                "chunk_seconds": round(elapsed, 3)
+            }
+
+if __name__ == "__main__":
+    # python batch.py questions.txt [results.jsonl]
+    with open(sys.argv[1], encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    out = open(sys.argv[2], "w", encoding="utf-8") if len(sys.argv) > 2 else sys.stdout
+    started = time.perf_counter()
+    try:
+        for i, record in enumerate(run_batch(queries), 1):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            print(f"{i}/{len(queries)} done", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(queries)} queries in {elapsed:.1f}s ({len(queries) / max(elapsed, 1e-9):.2f} q/s)", file=sys.stderr)
@@ -0,0 +1,203 @@
+#context_budget.py
+import re
+from tracing import span
+
+# Shrinks the evidence sent to each LLM call. Prompt prefill dominates
+# latency for a 1B model on CPU, so every node gets a token budget:
+# graph rows are always kept (compacted into tables), near-duplicate
+# reviews are dropped and review text is trimmed to what is left.
+
+# Approximate prompt tokens allowed for context per node
+BUDGETS = {
+    "rank": 1200,
+    "answer": 900,
+    "critic": 700,
+    "supervisor": 200
+}
+# Word-shingle Jaccard similarity above which two reviews count as one
+DUPLICATE_THRESHOLD = 0.85
+# Never trim a review below this many tokens; drop it instead
+MIN_REVIEW_TOKENS = 24
+
+# Rough BPE estimate: long words split every 4 characters
+TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+def count_tokens(text):
+    return len(TOKEN.findall(text or ""))
+
+def truncate_tokens(text, limit):
+    pieces = list(TOKEN.finditer(text))
+    if len(pieces) <= limit:
+        return text
+    return text[:pieces[limit - 1].end()].rstrip() + "…"
+
+# ======================================================
+# DEDUPLICATION
+# ======================================================
+def _shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def dedupe(texts, threshold=DUPLICATE_THRESHOLD, key=None):
+    # Keeps the first of every group of near-identical texts, in order;
+    # key(text) picks the part to compare
+    kept, seen = [], []
+    for text in texts:
+        shingles = _shingles(key(text) if key else text)
+        if any(len(shingles & s) / (len(shingles | s) or 1) >= threshold for s in seen):
+            continue
+        kept.append(text)
+        seen.append(shingles)
+    return kept
+
+# ======================================================
+# COMPACTION
+# ======================================================
+# Shapes produced by agents.format_row and agents.format_vector_doc
+RATING_ROW = re.compile(
+    r"^(?P<kind>Brand|Product) (?P<name>.+?) has average rating (?P<rating>[\d.]+)"
+    r"(?: from (?P<reviews>\d+) reviews)?(?: \(brand (?P<brand>.+)\))?$"
+)
+PRICE_ROW = re.compile(
+    r"^(?P<kind>Brand|Product) (?P<name>.+?) prices range from (?P<min>\S+) to (?P<max>\S+)"
+    r"(?: across (?P<products>\d+) products)?$"
+)
+REVIEW_DOC = re.compile(
+    r"^Brand:(?P<brand>.*?) Product:(?P<product>.*?) "
+    r"(?:Rating:(?P<rating>\S+) Votes:(?P<votes>\S+)(?: Price:(?P<price>\S+))? )?Review:(?P<text>.*)$",
+    re.DOTALL
+)
+
+def compact_graph(rows):
+    # One table per row shape (and Brand/Product) instead of a sentence per row
+    tables, other = {}, []
+    for row in rows:
+        m = RATING_ROW.match(row) or PRICE_ROW.match(row)
+        if m:
+            shape = "ratings" if m.re is RATING_ROW else "prices"
+            tables.setdefault((shape, m["kind"]), []).append(m)
+        else:
+            other.append(row)
+
+    blocks = []
+    for (shape, kind), matches in tables.items():
+        if shape == "ratings":
+            with_brand = any(m["brand"] for m in matches)
+            header = f"{kind.lower()} | avg_rating | reviews" + (" | brand" if with_brand else "")
+            lines = [
+                " | ".join([m["name"], m["rating"], m["reviews"] or "-"] + ([m["brand"] or "-"] if with_brand else []))
+                for m in matches
+            ]
+        else:
+            header = f"{kind.lower()} | min_price | max_price | products"
+            lines = [" | ".join([m["name"], m["min"], m["max"], m["products"] or "-"]) for m in matches]
+        blocks.append(f"Graph {shape}:\n" + header + "\n" + "\n".join(lines))
+    if other:
+        blocks.append("Graph rows:\n" + "\n".join(other))
+    return "\n\n".join(blocks)
+
+def compact_reviews(docs, budget):
+    # Groups reviews under one "brand | product" header each and trims
+    # review text so the block fits in `budget` tokens
+    groups, order = {}, []
+    for doc in docs:
+        m = REVIEW_DOC.match(doc)
+        key = (m["brand"], m["product"]) if m else (None, None)
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(m or doc)
+
+    lines, used = ["Reviews:"], 1
+    for key in order:
+        header = f"[{key[0]} | {key[1]}]" if key[0] is not None else None
+        if header:
+            if used + count_tokens(header) + MIN_REVIEW_TOKENS > budget:
+                break
+            lines.append(header)
+            used += count_tokens(header)
+
+        for item in groups[key]:
+            if isinstance(item, str):
+                prefix, text = "- ", item
+            else:
+                meta = [f"{item['rating']}★" if item["rating"] else None,
+                        f"{item['votes']} votes" if item["votes"] not in (None, "0") else None,
+                        f"${item['price']}" if item["price"] else None]
+                meta = ", ".join(m for m in meta if m)
+                prefix, text = f"- ({meta}) " if meta else "- ", item["text"].strip()
+
+            left = budget - used - count_tokens(prefix)
+            if left < MIN_REVIEW_TOKENS:
+                break
+            text = truncate_tokens(text, left)
+            lines.append(prefix + text)
+            used += count_tokens(prefix + text)
+
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+# ======================================================
+# PER-NODE CONTEXT
+# ======================================================
+def _review_text(doc):
+    # Compare reviews by their text, not the brand/rating prefix
+    m = REVIEW_DOC.match(doc)
+    return m["text"] if m else doc
+
+def _split(docs, graph_docs):
+    graph_docs = set(graph_docs or [])
+    graph = list(dict.fromkeys(d for d in docs if d in graph_docs))
+    reviews = dedupe([d for d in docs if d not in graph_docs], key=_review_text)
+    return graph, reviews
+
+def build_context(docs, graph_docs, node):
+    # Compact text block for the answer/critic prompts
+    with span("context.compact", node=node) as s:
+        graph, reviews = _split(docs, graph_docs)
+        graph_block = compact_graph(graph)
+        budget = BUDGETS[node] - count_tokens(graph_block)
+        review_block = compact_reviews(reviews, budget)
+
+        context = "\n\n".join(b for b in (graph_block, review_block) if b)
+        s["attrs"].update(
+            tokens_before=sum(count_tokens(d) for d in docs),
+            tokens_after=count_tokens(context)
+        )
+    return context or "No context retrieved."
+
+def budget_docs(docs, graph_docs, node):
+    # Same budget, but keeps a list of documents so the ranker can
+    # select from them: graph rows whole, reviews deduped and trimmed
+    with span("context.compact", node=node) as s:
+        graph, reviews = _split(docs, graph_docs)
+        left = BUDGETS[node] - sum(count_tokens(d) for d in graph)
+
+        kept = []
+        for doc in reviews:
+            if left < MIN_REVIEW_TOKENS:
+                break
+            doc = truncate_tokens(doc, left)
+            kept.append(doc)
+            left -= count_tokens(doc)
+
+        result = graph + kept
+        s["attrs"].update(
+            tokens_before=sum(count_tokens(d) for d in docs),
+            tokens_after=sum(count_tokens(d) for d in result)
+        )
+    return result
+
+def supervisor_view(state):
+    # What the supervisor needs to pick the next agent, not the evidence
+    answer = state.get("answer") or ""
+    budget = BUDGETS["supervisor"]
+    return "\n".join([
+        f"query: {truncate_tokens(state.get('query', ''), budget // 4)}",
+        f"retrieved: {len(state.get('docs') or [])} docs ({len(state.get('graph_docs') or [])} graph rows)",
+        f"ranked: {len(state.get('ranked_docs') or [])} docs",
+        f"answer: {truncate_tokens(answer, budget // 2) if answer else '(none)'}",
+        f"validated: {state.get('validated')}",
+        f"recommendation: {'yes' if state.get('recommendation') else 'no'}"
+    ])
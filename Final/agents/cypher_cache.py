@@ -0,0 +1,48 @@
+#cypher_cache.py
+import time
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    # Thread-safe LRU with a per-entry TTL, flushed whenever the data
+    # version it was filled against changes (see offline/versions.py)
+
+    def __init__(self, max_size=512, ttl=3600, version=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version or (lambda: None)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._seen_version = self.version()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        current = self.version()
+        if current != self._seen_version:
+            self._items.clear()
+            self._seen_version = current
+
+    def get(self, key):
+        with self._lock:
+            self._check_version()
+            entry = self._items.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._items.pop(key, None)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._check_version()
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,77 @@
+#cypher_guard.py
+import re
+from neo4j import Query, READ_ACCESS
+
+# Cost guard for LLM-generated Cypher: read-only, bounded output,
+# EXPLAIN-checked plan and a server-side transaction timeout.
+
+# Reject plans whose estimate at any operator exceeds this many rows
+MAX_ESTIMATED_ROWS = 1_000_000
+# LIMIT appended when the final RETURN has none
+DEFAULT_LIMIT = 20
+# Server-side transaction timeout (seconds)
+TX_TIMEOUT = 5.0
+# Records pulled per round trip
+FETCH_SIZE = 100
+
+REJECTED_OPERATORS = ("CartesianProduct",)
+
+WRITE_CLAUSES = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b"
+    r"|\bCALL\s+(dbms|db\.(create|drop|index|constraint))",
+    re.IGNORECASE
+)
+
+class CypherRejected(Exception):
+    pass
+
+def read_session(driver):
+    return driver.session(fetch_size=FETCH_SIZE, default_access_mode=READ_ACCESS)
+
+def prepare(cypher, params=None):
+    # Static checks + enforced LIMIT; returns (cypher, params)
+    cypher = cypher.strip().rstrip(";").strip()
+    params = dict(params or {})
+
+    if not cypher:
+        raise CypherRejected("empty query")
+    if WRITE_CLAUSES.search(cypher):
+        raise CypherRejected("write clauses are not allowed")
+
+    returns = [m.end() for m in re.finditer(r"\bRETURN\b", cypher, re.IGNORECASE)]
+    if not returns:
+        raise CypherRejected("query has no RETURN")
+    if not re.search(r"\bLIMIT\b", cypher[returns[-1]:], re.IGNORECASE):
+        cypher += "\nLIMIT $guard_limit"
+        params["guard_limit"] = DEFAULT_LIMIT
+
+    return cypher, params
+
+def _operators(plan):
+    yield plan
+    for child in plan.get("children", []):
+        yield from _operators(child)
+
+def check_plan(plan):
+    for op in _operators(plan or {}):
+        name = op.get("operatorType", "").split("@")[0]
+        if name in REJECTED_OPERATORS:
+            raise CypherRejected(f"plan contains {name}")
+
+        args = op.get("args") or op.get("arguments") or {}
+        estimated = args.get("EstimatedRows") or 0
+        if estimated > MAX_ESTIMATED_ROWS:
+            raise CypherRejected(f"{name} estimates {estimated:,.0f} rows")
+
+def run_guarded(session, cypher, params=None):
+    cypher, params = prepare(cypher, params)
+    plan = session.run("EXPLAIN " + cypher, params).consume().plan
+    check_plan(plan)
+    return list(session.run(Query(cypher, timeout=TX_TIMEOUT), params))
+
+async def arun_guarded(session, cypher, params=None):
+    cypher, params = prepare(cypher, params)
+    summary = await (await session.run("EXPLAIN " + cypher, params)).consume()
+    check_plan(summary.plan)
+    result = await session.run(Query(cypher, timeout=TX_TIMEOUT), params)
+    return [r async for r in result]
@@ -0,0 +1,62 @@
+#cypher_params.py
+import re
+
+# Lifts string and number literals out of generated Cypher into $params,
+# so structurally identical queries share one Neo4j plan-cache entry.
+
+PARAM_PREFIX = "lit_"
+
+# Relationship type list inside a pattern: :KNOWS, :A|B, :`odd name`
+REL_TYPES = r"(?::\s*(?:\w+|`[^`]*`)(?:\s*\|\s*:?\s*(?:\w+|`[^`]*`))*\s*)?"
+
+TOKEN = re.compile(r"""
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<comment>//[^\n]*)
+  | (?P<escaped>`[^`]*`)
+  | (?P<param>\$\w+)
+  # Variable-length bounds only count inside a relationship pattern,
+  # -[r:TYPE*1..3]-; elsewhere * is multiplication
+  | (?P<range>-\s*\[\s*(?:\w+\s*)?""" + REL_TYPES + r"""\*\s*\d*\s*(?:\.\.\s*\d*)?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  # .5 is a number, but the 3 of a 1..3 slice is not .3
+  | (?P<number>\d+\.\d+(?:[eE][+-]?\d+)?|(?<![\w.])\.\d+(?:[eE][+-]?\d+)?|\d+(?:[eE][+-]?\d+)?)
+""", re.VERBOSE)
+
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f",
+           "'": "'", '"': '"', "\\": "\\"}
+
+def _unquote(literal):
+    body = literal[1:-1]
+    return re.sub(r"\\(.)", lambda m: ESCAPES.get(m.group(1), m.group(1)), body)
+
+def _number(text):
+    if re.fullmatch(r"\d+", text):
+        return int(text)
+    return float(text)
+
+def parameterize(cypher, params=None):
+    # Returns (cypher, params). Existing $params are kept as-is; each
+    # distinct literal gets one $lit_N. Variable-length bounds (*1..3)
+    # stay literal because Cypher does not allow parameters there.
+    params = dict(params or {})
+    names = {}
+    out = []
+    pos = 0
+
+    for m in TOKEN.finditer(cypher):
+        kind = m.lastgroup
+        if kind not in ("string", "number"):
+            continue
+
+        value = _unquote(m.group()) if kind == "string" else _number(m.group())
+        key = (kind, value)
+        if key not in names:
+            names[key] = f"{PARAM_PREFIX}{len(names)}"
+            params[names[key]] = value
+
+        out.append(cypher[pos:m.start()])
+        out.append("$" + names[key])
+        pos = m.end()
+
+    out.append(cypher[pos:])
+    return "".join(out), params
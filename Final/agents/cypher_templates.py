@@ -0,0 +1,125 @@
+#cypher_templates.py
+import re
+
+# Parameterized Cypher for the question shapes that dominate traffic.
+# They read the aggregates materialized by offline/aggregate_graph.py.
+
+DEFAULT_LIMIT = 20
+# Ignore tiny brands/products when ranking "best" without a filter
+MIN_REVIEWS = 20
+
+BRAND_RATINGS = """
+MATCH (b:Brand)
+WHERE {filter}
+RETURN b.name AS brand, b.avg_rating AS avg_rating, b.review_count AS review_count
+ORDER BY avg_rating {direction}
+LIMIT $limit
+"""
+
+TOP_PRODUCTS = """
+MATCH (b:Brand)-[:MAKES]->(p:Product)
+WHERE {filter}
+RETURN p.name AS product, b.name AS brand, p.avg_rating AS avg_rating, p.review_count AS review_count
+ORDER BY avg_rating {direction}, review_count DESC
+LIMIT $limit
+"""
+
+BRAND_PRICES = """
+MATCH (b:Brand)
+WHERE {filter}
+RETURN b.name AS brand, b.min_price AS min_price, b.max_price AS max_price, b.product_count AS product_count
+ORDER BY {order}
+LIMIT $limit
+"""
+
+RATING_WORDS = r"\b(rating|ratings|rated|stars?|score|best|top|highest|lowest|worst)\b"
+PRODUCT_WORDS = r"\b(products?|phones?|models?|devices?|handsets?|smartphones?)\b"
+TOP_WORDS = r"\b(top|best|highest[- ]rated|most popular|recommend)\b"
+# Superlatives that flip the sort to ascending
+LOW_WORDS = r"\b(worst|lowest|least|poorest|bottom|low[- ]rated|badly rated)\b"
+EXPENSIVE_WORDS = r"\b(most expensive|expensive|priciest|pricey|highest[- ]priced?|premium)\b"
+PRICE_WORDS = r"\b(price|prices|priced|pricing|cost|costs|cheap|cheaper|cheapest|expensive|budget|afford\w*)\b"
+COMPARE_WORDS = r"\b(compare|comparison|versus|vs\.?|between|each|per|which brand|brands)\b"
+LIMIT_PHRASE = r"\b(?:top|best|first|worst|bottom|lowest)\s+(\d{1,3})\b"
+# Words that carry no constraint of their own. Anything else left in a
+# question after its template's vocabulary is removed ("camera",
+# "under $300", "worth", "gaming") is a condition the template cannot
+# express, so the question goes to the LLM instead.
+FILLER_WORDS = set("""
+a an the of in on for to by from with and or is are was were be do does did
+which what who whose how show list give get find tell me us i my we our you
+there it its has have had most more overall all any some their them they
+please currently available according average avg
+brand brands manufacturer manufacturers company companies
+review reviews reviewed customer customers user users
+""".split())
+
+def normalize_question(question):
+    text = re.sub(r"[^\w\s$.-]", " ", question.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+def find_brands(question, brands):
+    text = f" {normalize_question(question)} "
+    found = []
+    for name in brands:
+        key = normalize_question(name)
+        if len(key) >= 2 and re.search(rf"(?<!\w){re.escape(key)}(?!\w)", text):
+            found.append(name)
+    return found
+
+def find_limit(question):
+    match = re.search(LIMIT_PHRASE, question.lower())
+    return int(match.group(1)) if match else DEFAULT_LIMIT
+
+def find_order(question):
+    # "asc" for worst/lowest-style questions, "desc" for the rest; used in
+    # templates and in the answer cache signature
+    q = normalize_question(question)
+    if re.search(EXPENSIVE_WORDS, q):
+        return "desc"
+    return "asc" if re.search(LOW_WORDS, q) else "desc"
+
+def _brand_filter(brands, alias_min_reviews):
+    if brands:
+        return "b.name IN $brands", {"brands": brands}
+    return f"{alias_min_reviews}.review_count >= $min_reviews", {"min_reviews": MIN_REVIEWS}
+
+def _fits(q, mentioned, vocabulary):
+    # True when nothing but the template's own words, the mentioned
+    # brands, a "top N" limit and filler is left in the question
+    text = re.sub(LIMIT_PHRASE, " ", q)
+    for name in mentioned:
+        text = re.sub(rf"(?<!\w){re.escape(normalize_question(name))}(?!\w)", " ", text)
+    for pattern in vocabulary:
+        text = re.sub(pattern, " ", text)
+    return all(word in FILLER_WORDS for word in re.findall(r"\$?\w+", text))
+
+def match_template(question, brands):
+    # Returns (cypher, params) when the whole question fits a template,
+    # else None
+    q = normalize_question(question)
+    mentioned = find_brands(question, brands)
+    limit = find_limit(question)
+
+    direction = find_order(question).upper()
+
+    if (re.search(PRODUCT_WORDS, q) and (re.search(TOP_WORDS, q) or re.search(LOW_WORDS, q))
+            and _fits(q, mentioned, [PRODUCT_WORDS, TOP_WORDS, LOW_WORDS, RATING_WORDS])):
+        where, params = _brand_filter(mentioned, "p")
+        cypher = TOP_PRODUCTS.format(filter=where, direction=direction)
+        return cypher.strip(), {**params, "limit": limit}
+
+    if ((re.search(PRICE_WORDS, q) or re.search(EXPENSIVE_WORDS, q)) and (mentioned or re.search(COMPARE_WORDS, q))
+            and _fits(q, mentioned, [EXPENSIVE_WORDS, PRICE_WORDS, COMPARE_WORDS, PRODUCT_WORDS])):
+        where, params = _brand_filter(mentioned, "b")
+        # Most expensive → highest max_price first; otherwise cheapest first
+        order = "max_price DESC" if re.search(EXPENSIVE_WORDS, q) else "min_price"
+        return BRAND_PRICES.format(filter=where, order=order).strip(), {**params, "limit": limit}
+
+    if (re.search(RATING_WORDS, q) and (mentioned or re.search(COMPARE_WORDS, q))
+            and _fits(q, mentioned, [RATING_WORDS, TOP_WORDS, LOW_WORDS, COMPARE_WORDS, PRODUCT_WORDS])):
+        where, params = _brand_filter(mentioned, "b")
+        cypher = BRAND_RATINGS.format(filter=where, direction=direction)
+        return cypher.strip(), {**params, "limit": limit}
+
+    return None
@@ -0,0 +1,71 @@
+#reranker.py
+import re
+import math
+from collections import Counter
+import numpy as np
+
+# Score = COSINE_WEIGHT * cosine + BM25_WEIGHT * bm25, with bm25 scaled
+# to [0, 1] within the candidates. Only vector docs are scored; graph rows
+# bypass it (see rank_context).
+COSINE_WEIGHT = 0.7
+BM25_WEIGHT = 0.3
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def bm25_scores(query, texts):
+    docs = [tokenize(t) for t in texts]
+    if not docs:
+        return np.zeros(0)
+
+    n = len(docs)
+    avg_len = sum(len(d) for d in docs) / n or 1.0
+    df = Counter(term for d in docs for term in set(d))
+    terms = set(tokenize(query))
+
+    scores = np.zeros(n)
+    for i, d in enumerate(docs):
+        tf = Counter(d)
+        for term in terms:
+            if term not in tf:
+                continue
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf[term] + BM25_K1 * (1 - BM25_B + BM25_B * len(d) / avg_len)
+            scores[i] += idf * tf[term] * (BM25_K1 + 1) / norm
+
+    top = scores.max()
+    return scores / top if top > 0 else scores
+
+def cosine_scores(query_vector, doc_vectors):
+    if not len(doc_vectors):
+        return np.zeros(0)
+    q = np.asarray(query_vector, dtype=np.float32)
+    m = np.asarray(doc_vectors, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1) * (np.linalg.norm(q) or 1.0)
+    return (m @ q) / np.where(norms == 0, 1.0, norms)
+
+def rerank(query, docs, snippets, query_vector, doc_vectors, top_k=5):
+    # docs: what the answer agent sees; snippets: the text that was
+    # embedded/matched for each doc
+    if not docs:
+        return []
+
+    scores = (
+        COSINE_WEIGHT * cosine_scores(query_vector, doc_vectors)
+        + BM25_WEIGHT * bm25_scores(query, snippets)
+    )
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [docs[i] for i in order]
+
+def rank_context(query, graph_rows, docs, snippets, query_vector, doc_vectors,
+                 top_k=5, min_docs=2):
+    # Graph rows come back from Cypher already ordered (ORDER BY
+    # avg_rating DESC ...), so they are kept whole and in order; only the
+    # vector docs are reranked, filling the slots left in top_k and never
+    # fewer than min_docs of them
+    slots = max(top_k - len(graph_rows), min_docs)
+    ranked = rerank(query, docs, snippets, query_vector, doc_vectors, top_k=slots)
+    return list(graph_rows) + ranked
@@ -0,0 +1,159 @@
+#resources.py
+import os
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Process-wide clients, each built on first use. Importing agents.py no
+# longer needs Ollama, Neo4j or Chroma to be up; the first request (or
+# warm_up()) pays the cost once and every later caller shares the result.
+
+# ---------------- CONFIG ----------------
+LLM_MODEL = "llama3.2:1b"
+EMBED_MODEL = "nomic-embed-text"
+# None = langchain_ollama / ollama client default (OLLAMA_HOST or localhost)
+OLLAMA_URL = os.getenv("OLLAMA_URL")
+# How long Ollama keeps a model in memory after the last request
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+CHROMA_DIR = os.path.join(BASE_DIR, "vectorstore", "chroma_amazon_reviews")
+
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_AUTH = ("neo4j", "Aigurukul@2.0")
+
+# ======================================================
+# REGISTRY
+# ======================================================
+class Registry:
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        # Re-entrant: a factory may need another resource (Chroma → embeddings)
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+
+    def names(self):
+        return list(self._factories)
+
+    def get(self, name):
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name, instance):
+        # Swap in a stand-in (benchmarks, tests); reset(name) restores the factory
+        with self._lock:
+            self._instances[name] = instance
+
+    def reset(self, name=None):
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def lazy(self, name):
+        return LazyResource(self, name)
+
+class LazyResource:
+    # Stands in for a registered client at module level: attribute access
+    # resolves (and on first use builds) the shared instance
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def resolve(self):
+        return self._registry.get(self._name)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy resource {self._name!r}>"
+
+registry = Registry()
+
+# ======================================================
+# FACTORIES
+# ======================================================
+def _chat_model(label):
+    from langchain_ollama import ChatOllama
+    from tracing import LLMTracer
+    # LLMTracer records tokens, tokens/sec and time to first token per call
+    return ChatOllama(model=LLM_MODEL, temperature=0, base_url=OLLAMA_URL,
+                      keep_alive=KEEP_ALIVE, callbacks=[LLMTracer(label)])
+
+def _embeddings():
+    from vectorstore.embedding_cache import cached_ollama_embeddings
+    # Shares the on-disk cache with build_chroma.py, so repeat queries skip Ollama
+    return cached_ollama_embeddings(EMBED_MODEL, base_url=OLLAMA_URL)
+
+def _vector_db():
+    from langchain_chroma import Chroma
+    return Chroma(
+        persist_directory=CHROMA_DIR,
+        embedding_function=registry.get("embeddings"),
+        collection_name="amazon_reviews"
+    )
+
+def _review_store():
+    from vectorstore.review_store import ReviewStore
+    # Full review text + numeric fields by review_id, built by offline/ingest.py
+    return ReviewStore()
+
+def _driver():
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+
+def _async_driver():
+    from neo4j import AsyncGraphDatabase
+    # Used by the async node variants (service/api.py via app.ainvoke)
+    return AsyncGraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+
+registry.register("agent_llm", lambda: _chat_model("agent"))
+registry.register("answer_llm", lambda: _chat_model("answer"))
+registry.register("embeddings", _embeddings)
+registry.register("vector_db", _vector_db)
+registry.register("review_store", _review_store)
+registry.register("driver", _driver)
+registry.register("async_driver", _async_driver)
+
+# ======================================================
+# WARM-UP
+# ======================================================
+def warm_up(models=True):
+    # Builds every client and loads the Ollama models into memory so the
+    # first user request does not pay for model loading
+    for name in registry.names():
+        registry.get(name)
+
+    try:
+        registry.get("driver").verify_connectivity()
+    except Exception as e:
+        print("Neo4j not reachable during warm-up:", e)
+
+    if not models:
+        return
+
+    import ollama
+    client = ollama.Client(host=OLLAMA_URL)
+    try:
+        # An empty prompt loads the model without generating anything
+        client.generate(model=LLM_MODEL, prompt="", keep_alive=KEEP_ALIVE)
+        client.embed(model=EMBED_MODEL, input="warm up", keep_alive=KEEP_ALIVE)
+        print(f"🔥 Ollama models loaded: {LLM_MODEL}, {EMBED_MODEL}")
+    except Exception as e:
+        print("Ollama warm-up failed:", e)
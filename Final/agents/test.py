@@ -13,12 +13,12 @@ query = "Compare the average ratings of Apple and Samsung products."
 
 print("\n========================")
 print("UNIT TEST 1 — CYPHER GENERATION")
-cypher = generate_cypher(query)
-print(cypher)
+cypher, params, source = generate_cypher(query)
+print(source, cypher, params)
 
 print("\n========================")
 print("UNIT TEST 2 — GRAPH RETRIEVAL")
-graph_rows = run_cypher(cypher)
+graph_rows = run_cypher(cypher, params)
 print(graph_rows)
 
 print("\n========================")
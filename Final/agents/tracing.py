@@ -0,0 +1,382 @@
+#tracing.py
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import bisect
+import threading
+import inspect
+import contextvars
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Opt-in: set RAG_TRACE_PATH to append one JSON object per finished
+# request there. Metrics and last_trace() work either way.
+TRACE_PATH = os.getenv("RAG_TRACE_PATH", "")
+# The file is rotated to TRACE_PATH + ".1" once it grows past this
+TRACE_MAX_BYTES = int(os.getenv("RAG_TRACE_MAX_MB", "50")) * 1024 * 1024
+# Persist the user's query and Cypher params too (off: they may hold user data)
+TRACE_RAW = os.getenv("RAG_TRACE_RAW", "0") == "1"
+# Traces waiting for the writer thread; more than this are dropped
+TRACE_QUEUE = 1000
+
+_trace = contextvars.ContextVar("rag_trace", default=None)
+_span = contextvars.ContextVar("rag_span", default=None)
+_last = {"trace": None}
+
+# ======================================================
+# METRICS (Prometheus text format)
+# ======================================================
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, value=1, labels=None, help=""):
+        with self._lock:
+            key = self._key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.help.setdefault(name, ("counter", help))
+
+    def observe(self, name, value, labels=None, help=""):
+        with self._lock:
+            key = self._key(name, labels)
+            h = self.histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+            i = bisect.bisect_left(LATENCY_BUCKETS, value)
+            if i < len(LATENCY_BUCKETS):
+                h["buckets"][i] += 1
+            h["sum"] += value
+            h["count"] += 1
+            self.help.setdefault(name, ("histogram", help))
+
+    def render(self):
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            for name, (kind, help) in sorted(self.help.items()):
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in sorted(self.counters.items()):
+                        if n == name:
+                            lines.append(f"{name}{fmt(labels)} {value}")
+                else:
+                    for (n, labels), h in sorted(self.histograms.items()):
+                        if n != name:
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(LATENCY_BUCKETS, h["buckets"]):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+                        lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {h['count']}")
+                        lines.append(f"{name}_sum{fmt(labels)} {h['sum']}")
+                        lines.append(f"{name}_count{fmt(labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def metrics_text():
+    return metrics.render()
+
+# ======================================================
+# TRACE FILE
+# ======================================================
+class TraceWriter:
+    # Appends traces from a background thread so end_trace() never does
+    # file I/O on the caller's thread (the event loop in service/api.py)
+
+    def __init__(self, max_pending=TRACE_QUEUE):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, data):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        try:
+            self._queue.put_nowait((path, data))
+        except queue.Full:
+            metrics.inc("rag_traces_dropped_total", help="Traces not written because the writer fell behind")
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, data = item
+            try:
+                _append(path, json.dumps(data, default=str) + "\n")
+            except OSError as e:
+                print("Trace write failed:", e)
+
+def _append(path, line):
+    if os.path.exists(path) and os.path.getsize(path) >= TRACE_MAX_BYTES:
+        os.replace(path, path + ".1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+def _redact(data):
+    spans = []
+    for s in data["spans"]:
+        attrs = {k: v for k, v in s["attrs"].items() if k != "params"}
+        spans.append({**s, "attrs": attrs})
+    return {**data, "query": None, "spans": spans}
+
+_writer = TraceWriter()
+
+# ======================================================
+# TRACES AND SPANS
+# ======================================================
+class Trace:
+
+    def __init__(self, query):
+        self.trace_id = uuid.uuid4().hex
+        self.query = query
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.duration = None
+        self.attrs = {}
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "query": self.query,
+            "start": self.wall_start,
+            "duration": self.duration,
+            "attrs": self.attrs,
+            "spans": sorted(self.spans, key=lambda s: s["start"])
+        }
+
+def current_trace():
+    return _trace.get()
+
+def last_trace():
+    return _last["trace"]
+
+def new_trace(query, **attrs):
+    trace = Trace(query)
+    trace.attrs.update(attrs)
+    return trace
+
+def end_trace(trace, error=None):
+    # Closes the trace, records request metrics and queues it for TRACE_PATH;
+    # returns the timing summary shown to users
+    trace.duration = time.perf_counter() - trace.started
+    if error is not None:
+        trace.attrs["error"] = repr(error)
+
+    metrics.inc("rag_requests_total", labels={"status": "error" if error else "ok"},
+                help="Pipeline requests served")
+    metrics.observe("rag_request_seconds", trace.duration, help="End-to-end pipeline latency")
+
+    data = trace.to_dict()
+    _last["trace"] = data
+    if TRACE_PATH:
+        _writer.submit(TRACE_PATH, data if TRACE_RAW else _redact(data))
+    return summarize(data)
+
+@contextmanager
+def activate(trace):
+    # Makes trace the target of span()/LLM callbacks in this context
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+@contextmanager
+def span(name, kind="internal", **attrs):
+    # Records into the active trace if there is one; metrics either way
+    trace = _trace.get()
+    parent = _span.get()
+    record = {
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "kind": kind,
+        "start": time.perf_counter() - trace.started if trace else 0.0,
+        "attrs": dict(attrs)
+    }
+    token = _span.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["attrs"]["error"] = repr(e)
+        metrics.inc("rag_errors_total", labels={"span": name}, help="Failed spans")
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - started
+        _span.reset(token)
+        metrics.observe(f"rag_{kind}_seconds", record["duration"], labels={"name": name},
+                        help=f"Latency of {kind} spans")
+        if trace:
+            trace.add(record)
+
+def _config_trace(config):
+    return ((config or {}).get("configurable") or {}).get("trace") or _trace.get()
+
+def traced_node(name, func):
+    # Wraps a LangGraph node (sync or async) in a "node" span. The trace
+    # travels in config["configurable"]["trace"] because LangGraph may run
+    # nodes in other threads/tasks than the caller. No functools.wraps:
+    # RunnableLambda must see the wrapper's own config parameter.
+    wants_config = "config" in inspect.signature(func).parameters
+
+    def call(state, config):
+        return func(state, config=config) if wants_config else func(state)
+
+    if inspect.iscoroutinefunction(func):
+        async def async_wrapper(state, config=None):
+            with activate(_config_trace(config)), span(name, kind="node"):
+                return await call(state, config)
+        async_wrapper.__name__ = func.__name__
+        return async_wrapper
+
+    def wrapper(state, config=None):
+        with activate(_config_trace(config)), span(name, kind="node"):
+            return call(state, config)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+def summarize(trace):
+    # Flat, ordered span list with depth for display
+    spans = trace.get("spans", [])
+    depth = {}
+    rows = []
+    for s in spans:
+        depth[s["span_id"]] = depth.get(s["parent_id"], -1) + 1 if s["parent_id"] else 0
+        attrs = s["attrs"]
+        detail = {k: attrs[k] for k in (
+            "rows", "source", "k", "hits", "prompt_tokens", "completion_tokens",
+            "tokens_per_second", "ttft", "tokens_before", "tokens_after", "error"
+        ) if attrs.get(k) is not None}
+        rows.append({
+            "name": s["name"],
+            "kind": s["kind"],
+            "depth": depth[s["span_id"]],
+            "start": round(s["start"], 4),
+            "seconds": round(s["duration"], 4),
+            **detail
+        })
+    return {"trace_id": trace["trace_id"], "total": round(trace["duration"], 4), "spans": rows}
+
+# ======================================================
+# LLM CALLBACKS
+# ======================================================
+class LLMTracer(BaseCallbackHandler):
+    # Attach to a chat model (callbacks=[LLMTracer("agent")]) to record
+    # one "llm" span per call with tokens, tokens/sec and time to first token
+
+    run_inline = True
+
+    def __init__(self, model_label):
+        self.model_label = model_label
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._runs[run_id] = {
+                "started": time.perf_counter(),
+                "first_token": None,
+                "trace": _trace.get(),
+                "parent": _span.get()
+            }
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run and run["first_token"] is None:
+                run["first_token"] = time.perf_counter()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+        metrics.inc("rag_errors_total", labels={"span": f"llm:{self.model_label}"}, help="Failed spans")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+
+        ended = time.perf_counter()
+        duration = ended - run["started"]
+        node = run["parent"]["name"] if run["parent"] else "unknown"
+
+        usage, meta = {}, {}
+        try:
+            message = response.generations[0][0].message
+            usage = getattr(message, "usage_metadata", None) or {}
+            meta = getattr(message, "response_metadata", None) or {}
+        except (IndexError, AttributeError):
+            pass
+
+        prompt_tokens = usage.get("input_tokens") or meta.get("prompt_eval_count")
+        completion_tokens = usage.get("output_tokens") or meta.get("eval_count")
+        # Ollama reports pure generation time; fall back to wall time
+        eval_seconds = (meta.get("eval_duration") or 0) / 1e9 or duration
+        ttft = run["first_token"] - run["started"] if run["first_token"] else None
+
+        attrs = {
+            "model": meta.get("model") or self.model_label,
+            "node": node,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": round(completion_tokens / eval_seconds, 2) if completion_tokens else None,
+            "ttft": ttft
+        }
+
+        labels = {"node": node}
+        metrics.observe("rag_llm_seconds", duration, labels=labels, help="LLM call latency")
+        if ttft is not None:
+            metrics.observe("rag_llm_ttft_seconds", ttft, labels=labels, help="LLM time to first token")
+        if prompt_tokens:
+            metrics.inc("rag_llm_tokens_total", prompt_tokens, labels={**labels, "type": "prompt"},
+                        help="LLM tokens processed")
+        if completion_tokens:
+            metrics.inc("rag_llm_tokens_total", completion_tokens, labels={**labels, "type": "completion"},
+                        help="LLM tokens processed")
+
+        trace = run["trace"]
+        if trace:
+            trace.add({
+                "span_id": uuid.uuid4().hex[:16],
+                "parent_id": run["parent"]["span_id"] if run["parent"] else None,
+                "name": f"llm:{self.model_label}",
+                "kind": "llm",
+                "start": run["started"] - trace.started,
+                "duration": duration,
+                "attrs": attrs
+            })
@@ -0,0 +1,540 @@
+#bench_agents.py
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENTS_DIR = os.path.join(BASE_DIR, "agents")
+
+# agents.py imports its siblings flat, so load it the same way test.py does
+sys.path.insert(0, AGENTS_DIR)
+import agents
+import tracing
+from tracing import LLMTracer
+from answer_cache import SemanticCache
+from cypher_cache import LRUCache
+from resources import registry
+
+# End-to-end benchmark of the compiled LangGraph app against in-process
+# stand-ins for Ollama, Neo4j and Chroma with configurable latency, so
+# orchestration overhead and caching/parallelism changes can be measured
+# without any of the real services running.
+
+# ---------------- CONFIG ----------------
+BASELINE_PATH = os.path.join(BASE_DIR, "benchmarks", "baseline_agents.json")
+CONCURRENCY = [1, 2, 4, 8, 16]
+REQUESTS_PER_LEVEL = 48
+# Allowed relative slowdown vs. the baseline before the run fails
+REGRESSION_THRESHOLD = 0.20
+
+BRANDS = ["Samsung", "Apple", "Motorola", "Nokia", "BLU", "LG", "Huawei", "Sony"]
+
+QUERIES = [
+    "Which brands have the best ratings?",
+    "Top 5 Samsung phones",
+    "Compare prices of Apple and Samsung",
+    "What do reviewers say about battery life?",
+    "Is the Nokia camera any good?",
+    "Which phones have the most reviews with screen problems?",
+    "Best rated Motorola products",
+    "How do LG and Sony ratings compare?",
+]
+
+STUB_CYPHER = """MATCH (b:Brand)-[:MAKES]->(p:Product)
+WHERE p.review_count >= 10
+RETURN p.name AS product, b.name AS brand, p.avg_rating AS avg_rating, p.review_count AS review_count
+ORDER BY avg_rating DESC
+LIMIT 10"""
+
+STUB_ANSWER = (
+    "Based on the reviews, Samsung and Apple lead on average rating, while "
+    "Motorola offers the best value for money. Battery life is the most "
+    "praised feature and screen durability the most common complaint. "
+    "Would you like a breakdown by price range?"
+)
+
+# ======================================================
+# STUB BACKENDS
+# ======================================================
+def _tokens(text):
+    return re.findall(r"\S+\s*", text)
+
+class StubChatModel(BaseChatModel):
+    # Deterministic replies chosen by system prompt; sleeps `latency`
+    # before the first token and then streams at `tokens_per_sec`
+
+    latency: float = 0.05
+    tokens_per_sec: float = 200.0
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _reply(self, messages):
+        system = messages[0].content if messages else ""
+        if "Cypher expert" in system:
+            return STUB_CYPHER
+        if "RankerAgent" in system:
+            docs = json.loads(messages[-1].content).get("retrieved_context", [])
+            return json.dumps({"top_context": docs[:5]})
+        if "grounded in context" in system:
+            return '{"valid": true}'
+        if "RecommendationAgent" in system:
+            return "Would you like to compare prices across these brands?"
+        if "SupervisorAgent" in system:
+            return '{"next": "end"}'
+        return STUB_ANSWER
+
+    @staticmethod
+    def _usage(messages, tokens):
+        prompt = sum(len(_tokens(str(m.content))) for m in messages)
+        return {"input_tokens": prompt, "output_tokens": len(tokens), "total_tokens": prompt + len(tokens)}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._reply(messages)
+        tokens = _tokens(text)
+        time.sleep(self.latency + len(tokens) / self.tokens_per_sec)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._reply(messages)
+        tokens = _tokens(text)
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_sec)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = _tokens(self._reply(messages))
+        time.sleep(self.latency)
+        for token in tokens:
+            time.sleep(1 / self.tokens_per_sec)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = _tokens(self._reply(messages))
+        await asyncio.sleep(self.latency)
+        for token in tokens:
+            await asyncio.sleep(1 / self.tokens_per_sec)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+class StubEmbeddings(Embeddings):
+    # Hash-seeded unit vectors: identical texts embed identically
+
+    def __init__(self, latency=0.002, dim=768):
+        self.latency = latency
+        self.dim = dim
+
+    def _vector(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        v = rng.standard_normal(self.dim).astype(np.float32)
+        return (v / np.linalg.norm(v)).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+def _stub_rows(cypher, params, max_rows):
+    # One row per result, with a value for every "AS alias" in the RETURN
+    if "RETURN b.name AS name" in cypher:
+        return [{"name": b} for b in BRANDS]
+
+    returns = cypher[cypher.upper().rfind("RETURN"):]
+    aliases = re.findall(r"\bAS\s+(\w+)", returns, re.IGNORECASE)
+    limit = (params or {}).get("limit") or (params or {}).get("guard_limit") or max_rows
+
+    rows = []
+    for i in range(min(limit, max_rows)):
+        row = {}
+        for alias in aliases:
+            if alias in ("brand", "name"):
+                row[alias] = BRANDS[i % len(BRANDS)]
+            elif alias == "product":
+                row[alias] = f"{BRANDS[i % len(BRANDS)]} Phone {i}"
+            elif alias in ("review_count", "product_count", "total_votes"):
+                row[alias] = 100 - i
+            else:
+                row[alias] = round(4.5 - i * 0.1, 2)
+        rows.append(row)
+    return rows
+
+class _StubSummary:
+    plan = {"operatorType": "ProduceResults", "args": {"EstimatedRows": 10}, "children": []}
+
+class StubResult:
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def consume(self):
+        return _StubSummary()
+
+class StubSession:
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params=None, **kwargs):
+        text = getattr(query, "text", query)
+        if text.startswith("EXPLAIN "):
+            return StubResult([])
+        time.sleep(self.driver.latency)
+        return StubResult(_stub_rows(text, params, self.driver.max_rows))
+
+class StubDriver:
+    # Answers every query with synthetic rows shaped by its RETURN clause
+
+    def __init__(self, latency=0.01, max_rows=10):
+        self.latency = latency
+        self.max_rows = max_rows
+
+    def session(self, **kwargs):
+        return StubSession(self)
+
+    def close(self):
+        pass
+
+class AsyncStubResult(StubResult):
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for row in self._rows:
+            yield row
+
+    async def consume(self):
+        return _StubSummary()
+
+class AsyncStubSession(StubSession):
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, params=None, **kwargs):
+        text = getattr(query, "text", query)
+        if text.startswith("EXPLAIN "):
+            return AsyncStubResult([])
+        await asyncio.sleep(self.driver.latency)
+        return AsyncStubResult(_stub_rows(text, params, self.driver.max_rows))
+
+class AsyncStubDriver(StubDriver):
+
+    def session(self, **kwargs):
+        return AsyncStubSession(self)
+
+    async def close(self):
+        pass
+
+class StubVectorStore:
+
+    def __init__(self, latency=0.01):
+        self.latency = latency
+
+    def similarity_search(self, query, k=4, **kwargs):
+        time.sleep(self.latency)
+        return self._docs(query, k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        time.sleep(self.latency)
+        return self._docs(str(embedding[:4]), k)
+
+    @staticmethod
+    def _docs(query, k):
+        rng = random.Random(query)
+        docs = []
+        for i in range(k):
+            brand = rng.choice(BRANDS)
+            docs.append(Document(
+                page_content=f"{brand} phone review {i}: battery lasts two days, screen scratches easily.",
+                metadata={"review_id": f"R{rng.randrange(10 ** 6)}", "brand": brand, "product": f"{brand} Phone {i}"}
+            ))
+        return docs
+
+class StubReviewStore:
+
+    def get(self, review_id):
+        return None
+
+    def get_many(self, review_ids):
+        return [None] * len(review_ids)
+
+# ======================================================
+# PATCHING
+# ======================================================
+_traces = {}
+_traces_lock = threading.Lock()
+
+def _capture_summarize(summarize):
+    # Keep full traces (with parent links) for the per-node breakdown
+    def wrapper(trace):
+        with _traces_lock:
+            _traces[trace["trace_id"]] = trace
+        return summarize(trace)
+    return wrapper
+
+def install_stubs(args):
+    # The real clients are never built: the registry hands out these instead
+    registry.override("agent_llm", StubChatModel(latency=args.llm_latency, tokens_per_sec=args.tokens_per_sec,
+                                                 callbacks=[LLMTracer("agent")]))
+    registry.override("answer_llm", StubChatModel(latency=args.llm_latency, tokens_per_sec=args.tokens_per_sec,
+                                                  callbacks=[LLMTracer("answer")]))
+    registry.override("embeddings", StubEmbeddings(latency=args.embed_latency))
+    registry.override("vector_db", StubVectorStore(latency=args.chroma_latency))
+    registry.override("review_store", StubReviewStore())
+    registry.override("driver", StubDriver(latency=args.neo4j_latency))
+    registry.override("async_driver", AsyncStubDriver(latency=args.neo4j_latency))
+
+    tracing.TRACE_PATH = ""
+    tracing.summarize = _capture_summarize(tracing.summarize)
+
+def reset_caches(args):
+    # Every level starts cold so levels are comparable
+    agents.cypher_cache = LRUCache(max_size=512, ttl=3600)
+    agents.answer_cache = SemanticCache(threshold=agents.ANSWER_CACHE_THRESHOLD if args.answer_cache else 2.0)
+    agents._brand_names.update(loaded=False, names=[])
+
+# ======================================================
+# DRIVER
+# ======================================================
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+def run_level_sync(queries, concurrency):
+    def one(query):
+        started = time.perf_counter()
+        result = agents.run_pipeline(query)
+        return time.perf_counter() - started, result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, queries))
+
+def run_level_async(queries, concurrency):
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(query):
+            async with slots:
+                started = time.perf_counter()
+                result = await agents.arun_pipeline(query)
+                return time.perf_counter() - started, result
+
+        return await asyncio.gather(*(one(q) for q in queries))
+
+    return asyncio.run(main())
+
+EXTERNAL_KINDS = ("llm", "neo4j", "chroma", "embedding")
+
+def _union(intervals):
+    total, end = 0.0, float("-inf")
+    for s, e in sorted(intervals):
+        if e > end:
+            total += e - max(s, end)
+            end = e
+    return total
+
+def node_breakdown(traces):
+    # Per node: mean wall time and mean time not spent waiting on a stub
+    # backend (overlapping backend calls are counted once)
+    per_node = {}
+    for trace in traces:
+        spans = {s["span_id"]: s for s in trace["spans"]}
+        external = {}
+        for s in trace["spans"]:
+            if s["kind"] not in EXTERNAL_KINDS:
+                continue
+            parent = spans.get(s["parent_id"])
+            while parent is not None and parent["kind"] != "node":
+                parent = spans.get(parent["parent_id"])
+            if parent is not None:
+                external.setdefault(parent["span_id"], []).append((s["start"], s["start"] + s["duration"]))
+
+        for s in trace["spans"]:
+            if s["kind"] != "node":
+                continue
+            waited = _union(external.get(s["span_id"], []))
+            entry = per_node.setdefault(s["name"], {"seconds": [], "overhead": []})
+            entry["seconds"].append(s["duration"])
+            entry["overhead"].append(max(s["duration"] - waited, 0.0))
+
+    return {
+        name: {
+            "mean": float(np.mean(v["seconds"])),
+            "overhead": float(np.mean(v["overhead"]))
+        }
+        for name, v in per_node.items()
+    }
+
+def run_benchmark(args):
+    run_level = run_level_async if args.mode == "async" else run_level_sync
+    levels = {}
+
+    for concurrency in args.concurrency:
+        reset_caches(args)
+        queries = [QUERIES[i % len(QUERIES)] for i in range(args.requests)]
+        run_level(queries[:1], 1)      # warm-up: imports, brand list, lazy init
+        _traces.clear()
+
+        started = time.perf_counter()
+        results = run_level(queries, concurrency)
+        elapsed = time.perf_counter() - started
+
+        latencies = [lat for lat, _ in results]
+        pipeline = [r["timings"]["total"] for _, r in results]
+        traces = list(_traces.values())
+        waited = [_union([(s["start"], s["start"] + s["duration"])
+                          for s in t["spans"] if s["kind"] in EXTERNAL_KINDS]) for t in traces]
+
+        levels[str(concurrency)] = {
+            "requests": len(results),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "throughput": len(results) / elapsed,
+            "overhead": float(np.mean([t["duration"] - w for t, w in zip(traces, waited)])) if traces else 0.0,
+            "pipeline_mean": float(np.mean(pipeline)),
+            "nodes": node_breakdown(traces)
+        }
+    return levels
+
+# ======================================================
+# REPORT / BASELINE
+# ======================================================
+def print_report(levels):
+    print(f"\n{'conc':>5} {'req':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'overhead ms':>12}")
+    for concurrency, m in levels.items():
+        print(f"{concurrency:>5} {m['requests']:>5} {m['p50'] * 1e3:>9.1f} {m['p95'] * 1e3:>9.1f} "
+              f"{m['p99'] * 1e3:>9.1f} {m['throughput']:>8.2f} {m['overhead'] * 1e3:>12.2f}")
+
+    for concurrency, m in levels.items():
+        print(f"\nPer-node (concurrency {concurrency}):  mean ms / overhead ms")
+        for name, n in m["nodes"].items():
+            print(f"  {name:<12} {n['mean'] * 1e3:>9.1f} {n['overhead'] * 1e3:>9.2f}")
+
+def stub_config(args):
+    return {
+        "mode": args.mode,
+        "requests": args.requests,
+        "llm_latency": args.llm_latency,
+        "tokens_per_sec": args.tokens_per_sec,
+        "neo4j_latency": args.neo4j_latency,
+        "chroma_latency": args.chroma_latency,
+        "embed_latency": args.embed_latency,
+        "answer_cache": args.answer_cache,
+        "ranker": agents.RANKER
+    }
+
+def compare(levels, baseline, threshold):
+    # Returns a list of human-readable regressions
+    failures = []
+    for concurrency, base in baseline["levels"].items():
+        current = levels.get(concurrency)
+        if current is None:
+            continue
+        for key in ("p50", "p95", "p99"):
+            if current[key] > base[key] * (1 + threshold):
+                failures.append(f"c={concurrency} {key} {base[key] * 1e3:.1f} → {current[key] * 1e3:.1f} ms")
+        if current["throughput"] < base["throughput"] * (1 - threshold):
+            failures.append(f"c={concurrency} throughput {base['throughput']:.2f} → {current['throughput']:.2f} req/s")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agent workflow against stub backends")
+    parser.add_argument("--mode", choices=["async", "sync"], default="async",
+                        help="arun_pipeline (service path) or run_pipeline in threads (Streamlit path)")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--neo4j-latency", type=float, default=0.01)
+    parser.add_argument("--chroma-latency", type=float, default=0.01)
+    parser.add_argument("--embed-latency", type=float, default=0.002)
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", help="also write the full results here")
+    args = parser.parse_args()
+
+    install_stubs(args)
+    levels = run_benchmark(args)
+    print_report(levels)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": stub_config(args), "levels": levels}, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"config": stub_config(args), "levels": levels}, f, indent=2)
+        print(f"\n✅ Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} — run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != stub_config(args):
+        print("\n⚠️ Baseline was recorded with different settings — skipping comparison")
+        return 0
+
+    failures = compare(levels, baseline, args.threshold)
+    if failures:
+        print(f"\n❌ Regressions beyond {args.threshold:.0%}:")
+        for f in failures:
+            print("  " + f)
+        return 1
+
+    print(f"\n✅ Within {args.threshold:.0%} of baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+#bench_ingest.py
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(BASE_DIR)
+
+# Times each offline stage (clean_data → load_graph → build_chroma) on
+# synthetic Amazon-style review CSVs of growing size. Every stage runs in
+# its own subprocess so peak RSS is per stage, and Chroma is fed by a
+# local stub embedder so embedding cost can be dialled in or out.
+
+# ---------------- CONFIG ----------------
+SIZES = [10_000, 100_000, 1_000_000]
+WORK_DIR = os.path.join(tempfile.gettempdir(), "rag_ingest_bench")
+SEED = 42
+
+# Roughly the shape of Amazon_Unlocked_Mobile.csv: ~400 brands with a
+# long tail, ~1 product per 90 reviews, ratings skewed to 5 and 1
+BRAND_COUNT = 400
+REVIEWS_PER_PRODUCT = 90
+RATING_WEIGHTS = {5: 0.55, 4: 0.15, 3: 0.08, 2: 0.06, 1: 0.16}
+SHORT_SHARE = 0.25      # reviews drawn from a small pool of duplicates
+LONG_SHARE = 0.10       # 1.5k–4k character reviews
+MISSING_SHARE = 0.01    # rows with a mandatory field blanked
+
+TOP_BRANDS = ["Samsung", "BLU", "Apple", "LG", "Nokia", "Motorola", "Huawei", "Sony",
+              "HTC", "ZTE", "Alcatel", "OtterBox", "Asus", "Xiaomi", "BlackBerry", "Lenovo"]
+MODEL_WORDS = ["Galaxy", "Vivo", "Life", "Studio", "Moto", "Lumia", "Xperia", "Ascend",
+               "One", "Zen", "Note", "Pro", "Max", "Neo", "Grand", "Desire"]
+SHORT_REVIEWS = ["Great phone!", "Good", "Excellent", "Works fine", "Love it", "Bad",
+                 "Not as described", "Five stars", "Very good product", "ok", "Perfect",
+                 "Does not work", "Good value for the money", "Fast shipping, great phone"]
+SENTENCES = [
+    "The battery easily lasts a full day with heavy use.",
+    "The screen is bright and sharp but scratches easily.",
+    "Camera quality is decent in daylight and poor at night.",
+    "It arrived unlocked and worked with my carrier right away.",
+    "The phone gets warm when playing games for a while.",
+    "Speaker volume is too low for calls in a noisy room.",
+    "Fingerprint sensor is fast and reliable.",
+    "After two months the charging port stopped working.",
+    "For this price it is hard to beat.",
+    "The software is clean without much bloatware.",
+    "Signal reception is weaker than my old phone.",
+    "Customer service replaced it without any trouble.",
+    "Storage fills up quickly, so get a memory card.",
+    "Face unlock works even in low light.",
+    "It was refurbished even though the listing said new.",
+]
+
+HEADER = ["Product Name", "Brand Name", "Price", "Rating", "Reviews", "Review Votes"]
+
+# ======================================================
+# SYNTHETIC DATA
+# ======================================================
+def _brands():
+    names = TOP_BRANDS + [f"Brand{i:03d}" for i in range(BRAND_COUNT - len(TOP_BRANDS))]
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(names))]
+    return names, weights
+
+def _products(rng, rows, brands, brand_weights):
+    count = max(50, rows // REVIEWS_PER_PRODUCT)
+    owners = rng.choices(brands, brand_weights, k=count)
+    products = []
+    for i, brand in enumerate(owners):
+        name = f"{brand} {rng.choice(MODEL_WORDS)} {i} {rng.choice([8, 16, 32, 64])}GB Unlocked Smartphone"
+        price = round(rng.lognormvariate(5.0, 0.8), 2)
+        products.append((name, brand, price))
+    weights = [1 / (rank + 1) ** 0.9 for rank in range(count)]
+    return products, weights
+
+def _review(rng):
+    roll = rng.random()
+    if roll < SHORT_SHARE:
+        return rng.choice(SHORT_REVIEWS)
+    if roll < SHORT_SHARE + LONG_SHARE:
+        text, target = [], rng.randint(1500, 4000)
+        while sum(len(s) + 1 for s in text) < target:
+            text.append(rng.choice(SENTENCES))
+        return " ".join(text)
+    return " ".join(rng.choices(SENTENCES, k=rng.randint(2, 8)))
+
+def generate(rows, path, seed=SEED):
+    # Writes a raw CSV with the same columns (and messiness) as the source
+    rng = random.Random(seed)
+    brands, brand_weights = _brands()
+    products, product_weights = _products(rng, rows, brands, brand_weights)
+    ratings, rating_weights = list(RATING_WEIGHTS), list(RATING_WEIGHTS.values())
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for product, brand, price in rng.choices(products, product_weights, k=rows):
+            row = [
+                product,
+                brand,
+                "" if rng.random() < 0.03 else price,
+                rng.choices(ratings, rating_weights)[0],
+                _review(rng),
+                "" if rng.random() < 0.3 else int(rng.expovariate(0.5))
+            ]
+            if rng.random() < MISSING_SHARE:
+                row[rng.choice([1, 3, 4])] = ""
+            writer.writerow(row)
+
+# ======================================================
+# STAGES (run inside a child process)
+# ======================================================
+def _paths(work):
+    return {
+        "raw": os.path.join(work, "raw.csv"),
+        "parquet": os.path.join(work, "cleaned.parquet"),
+        "csv": os.path.join(work, "cleaned.csv"),
+        "chroma": os.path.join(work, "chroma")
+    }
+
+def _point_at(work):
+    # Redirect every stage's inputs/outputs into the work directory and
+    # keep version stamps of the real data untouched
+    from offline import clean_data, aggregate_graph
+    paths = _paths(work)
+    clean_data.CLEAN_PARQUET_PATH = paths["parquet"]
+    clean_data.CLEAN_PATH = paths["csv"]
+    aggregate_graph.bump_version = lambda name: None
+    return paths
+
+def _parquet_rows(path):
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).metadata.num_rows
+
+class StubEmbeddings:
+    # Random unit-scale vectors with an optional per-call delay
+
+    def __init__(self, latency=0.0, dim=768):
+        import numpy as np
+        self.np = np
+        self.latency = latency
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        self.rng = np.random.default_rng(SEED)
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        self.misses += len(texts)
+        return self.rng.standard_normal((len(texts), self.dim), dtype=self.np.float32).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def stage_clean(work, args):
+    from offline.clean_data import clean_data
+    paths = _point_at(work)
+    clean_data(paths["raw"], paths["parquet"], paths["csv"], write_csv=args.write_csv)
+    return {"rows": _parquet_rows(paths["parquet"])}
+
+def stage_graph(work, args):
+    paths = _point_at(work)
+    from offline import load_graph
+
+    if not args.neo4j_uri:
+        # Client side only: read Parquet and build UNWIND batches
+        df = load_graph.read_cleaned(columns=["brand", "product", "price", "rating", "votes"])
+        rows = sum(len(batch) for batch in load_graph.iter_batches(df))
+        return {"rows": rows, "note": "prep only (no --neo4j-uri)"}
+
+    from neo4j import GraphDatabase
+    load_graph.driver = GraphDatabase.driver(args.neo4j_uri, auth=(args.neo4j_user, args.neo4j_password))
+    load_graph.load_graph(writers=args.writers)
+    return {"rows": _parquet_rows(paths["parquet"])}
+
+def stage_chroma(work, args):
+    paths = _point_at(work)
+    from vectorstore import build_chroma
+    build_chroma.CHROMA_DIR = paths["chroma"]
+    build_chroma.MANIFEST_PATH = os.path.join(paths["chroma"], "manifest.json")
+    build_chroma.JOURNAL_PATH = os.path.join(paths["chroma"], "manifest.journal")
+    build_chroma.IN_PROGRESS_PATH = os.path.join(paths["chroma"], ".build_in_progress")
+    build_chroma.bump_version = lambda name: None
+    build_chroma.get_embedding = lambda: StubEmbeddings(latency=args.embed_latency)
+
+    build_chroma.build_chroma(incremental=False)
+    return {"rows": _parquet_rows(paths["parquet"]), "chunks": build_chroma.get_collection().count()}
+
+STAGES = {"clean": stage_clean, "graph": stage_graph, "chroma": stage_chroma}
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_child(args):
+    started = time.perf_counter()
+    result = STAGES[args.stage](args.work, args)
+    result["seconds"] = time.perf_counter() - started
+    result["peak_rss_mb"] = peak_rss_mb()
+    print("RESULT " + json.dumps(result))
+
+# ======================================================
+# PARENT
+# ======================================================
+def run_stage(stage, work, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--stage", stage, "--work", work,
+           "--embed-latency", str(args.embed_latency), "--writers", str(args.writers)]
+    if args.write_csv:
+        cmd.append("--write-csv")
+    if args.neo4j_uri:
+        cmd += ["--neo4j-uri", args.neo4j_uri, "--neo4j-user", args.neo4j_user,
+                "--neo4j-password", args.neo4j_password]
+
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if args.verbose or proc.returncode != 0:
+        print(proc.stdout, end="")
+        print(proc.stderr, end="", file=sys.stderr)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{stage} stage failed (exit {proc.returncode})")
+
+    line = next(l for l in reversed(proc.stdout.splitlines()) if l.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the offline ingestion stages")
+    parser.add_argument("--sizes", type=lambda s: [parse_size(x) for x in s.split(",")], default=SIZES,
+                        help="comma separated row counts, e.g. 10k,100k,1m")
+    parser.add_argument("--stages", default="clean,graph,chroma")
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="stub seconds per embed call")
+    parser.add_argument("--write-csv", action="store_true", help="also write the legacy cleaned CSV")
+    parser.add_argument("--neo4j-uri", help="scratch Neo4j to load into; it WILL be written to")
+    parser.add_argument("--neo4j-user", default="neo4j")
+    parser.add_argument("--neo4j-password", default="")
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--json", help="also write the results here")
+    parser.add_argument("--verbose", action="store_true", help="show stage output")
+    # internal: run one stage in this process
+    parser.add_argument("--stage", choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument("--work", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        run_child(args)
+        return
+
+    stages = [s.strip() for s in args.stages.split(",")]
+    results = []
+    for size in args.sizes:
+        work = os.path.join(args.work_dir, str(size))
+        os.makedirs(work, exist_ok=True)
+        raw = _paths(work)["raw"]
+        if not os.path.exists(raw):
+            started = time.perf_counter()
+            generate(size, raw)
+            print(f"🧪 Generated {size:,} rows in {time.perf_counter() - started:.1f}s → {raw}")
+
+        for stage in stages:
+            r = run_stage(stage, work, args)
+            r.update(size=size, stage=stage, rows_per_sec=r["rows"] / max(r["seconds"], 1e-9))
+            results.append(r)
+            print(f"  {size:>9,} {stage:<7} {r['seconds']:>8.1f}s {r['rows_per_sec']:>10,.0f} rows/s "
+                  f"{r['peak_rss_mb']:>8.0f} MB  {r.get('note', '')}")
+
+    print(f"\n{'rows':>9} {'stage':<7} {'seconds':>9} {'rows/s':>10} {'peak MB':>9}")
+    for r in results:
+        print(f"{r['size']:>9,} {r['stage']:<7} {r['seconds']:>9.1f} {r['rows_per_sec']:>10,.0f} {r['peak_rss_mb']:>9.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,36 @@
 import streamlit as st
 import sys
 import os
+import json
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from agents.agents import app
+# Set to e.g. http://127.0.0.1:8000 to call service/api.py instead of
+# running the pipeline inside this Streamlit process
+SERVICE_URL = os.getenv("RAG_SERVICE_URL")
+
+if SERVICE_URL:
+    import requests
+
+    def stream_pipeline(query):
+        with requests.post(f"{SERVICE_URL}/ask/stream", json={"query": query}, stream=True) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                kind = next(iter(event))
+                yield kind, event[kind]
+else:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from agents.agents import stream_pipeline, registry, warm_up
+
+    @st.cache_resource(show_spinner="Loading models...")
+    def shared_resources():
+        # Once per server process, not per session or rerun: builds the
+        # clients and loads the Ollama models before the first question
+        warm_up()
+        return registry
 
 st.set_page_config(
     page_title="Hybrid Graph + Vector RAG",
@@ -11,6 +38,9 @@ st.set_page_config(
     page_icon="📊"
 )
 
+if not SERVICE_URL:
+    shared_resources()
+
 # Sidebar
 with st.sidebar:
     st.markdown("## 📊 AI Assistant")
@@ -25,6 +55,9 @@ with st.sidebar:
     st.success("Vector DB: Active")
     st.success("Neo4j Graph: Connected")
     st.info("LLM: Ollama Local")
+    st.markdown("---")
+    st.markdown("### Last Request Timings")
+    timings_box = st.empty()
 
 # Header
 st.markdown("""
@@ -47,45 +80,80 @@ with col2:
     query = st.text_input("", placeholder="Example: Which brand has highest average rating?")
     run_btn = st.button("Run AI Agents", use_container_width=True)
 
+# Result panels
+def render_answer(box, query, answer):
+    box.markdown(
+    f"""
+    <div style='background:#f5f7fb;padding:20px;border-radius:12px'>
+    <h4>Query</h4>
+    <p>{query}</p>
+    <hr>
+    <h4>Answer</h4>
+    <p>{answer}</p>
+    </div>
+    """,
+    unsafe_allow_html=True
+    )
+
+def render_recommendation(box, recommendation):
+    box.markdown(
+    f"""
+    <div style='background:#eaf7ef;padding:20px;border-radius:12px'>
+    <h4>Recommendation</h4>
+    <p>{recommendation}</p>
+    </div>
+    """,
+    unsafe_allow_html=True
+    )
+
+def render_timings(box, timings):
+    # One row per span from the request trace, indented by nesting depth
+    if not timings:
+        box.caption("No requests yet")
+        return
+
+    lines = [f"**Total: {timings['total']:.2f}s**", "", "| Span | Time | Detail |", "|---|---:|---|"]
+    for s in timings["spans"]:
+        name = "&nbsp;&nbsp;" * 2 * s["depth"] + s["name"]
+        detail = ", ".join(
+            f"{k}={round(v, 3) if isinstance(v, float) else v}" for k, v in s.items()
+            if k not in ("name", "kind", "depth", "start", "seconds")
+        )
+        lines.append(f"| {name} | {s['seconds']:.3f}s | {detail} |")
+    box.markdown("\n".join(lines), unsafe_allow_html=True)
+
+render_timings(timings_box, st.session_state.get("timings"))
+
 # Run pipeline
 if run_btn and query:
 
-    with st.spinner("Running AI Agents..."):
-        result = app.invoke({
-            "query": query,
-            "docs": [],
-            "ranked_docs": [],
-            "answer": "",
-            "validated": False,
-            "recommendation": ""
-        })
-
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("## Results")
 
     res1, res2 = st.columns([3,1])
 
     with res1:
-        st.markdown(
-        f"""
-        <div style='background:#f5f7fb;padding:20px;border-radius:12px'>
-        <h4>Query</h4>
-        <p>{query}</p>
-        <hr>
-        <h4>Answer</h4>
-        <p>{result.get('answer','No answer generated')}</p>
-        </div>
-        """,
-        unsafe_allow_html=True
-        )
-
+        answer_box = st.empty()
     with res2:
-        st.markdown(
-        f"""
-        <div style='background:#eaf7ef;padding:20px;border-radius:12px'>
-        <h4>Recommendation</h4>
-        <p>{result.get('recommendation','No recommendation')}</p>
-        </div>
-        """,
-        unsafe_allow_html=True
-        )
+        rec_box = st.empty()
+
+    render_answer(answer_box, query, "…")
+    render_recommendation(rec_box, "…")
+
+    # Tokens render as answer_node produces them; critic and
+    # recommendation keep running after the answer is complete
+    answer = ""
+    result = {}
+    with st.spinner("Running AI Agents..."):
+        for kind, payload in stream_pipeline(query):
+            if kind == "token":
+                answer += payload
+                render_answer(answer_box, query, answer + " ▌")
+            elif kind == "result":
+                result = payload
+
+    render_answer(answer_box, query, result.get('answer') or answer or 'No answer generated')
+    render_recommendation(rec_box, result.get('recommendation') or 'No recommendation')
+
+    st.session_state["timings"] = result.get("timings")
+    render_timings(timings_box, st.session_state["timings"])
@@ -0,0 +1,83 @@
+#aggregate_graph.py
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(BASE_DIR)
+from offline.versions import bump_version
+
+# Names recomputed per transaction
+AGG_BATCH = 2000
+
+# ---------------- CYPHER ----------------
+# Product aggregates come straight from its reviews
+PRODUCT_AGGREGATES = """
+    UNWIND $names AS name
+    MATCH (p:Product {name: name})
+    OPTIONAL MATCH (p)-[:HAS_REVIEW]->(r:Review)
+    WITH p,
+         avg(r.rating) AS avg_rating,
+         count(r) AS review_count,
+         sum(coalesce(r.votes, 0)) AS total_votes,
+         min(r.price) AS min_price,
+         max(r.price) AS max_price
+    SET p.avg_rating = avg_rating,
+        p.review_count = review_count,
+        p.total_votes = total_votes,
+        p.min_price = coalesce(min_price, p.price),
+        p.max_price = coalesce(max_price, p.price)
+"""
+
+# Brand aggregates roll up the (already updated) products, so a brand
+# costs O(products) instead of O(reviews)
+BRAND_AGGREGATES = """
+    UNWIND $names AS name
+    MATCH (b:Brand {name: name})
+    OPTIONAL MATCH (b)-[:MAKES]->(p:Product)
+    WITH b,
+         sum(coalesce(p.avg_rating, 0) * coalesce(p.review_count, 0)) AS rating_sum,
+         sum(coalesce(p.review_count, 0)) AS review_count,
+         sum(coalesce(p.total_votes, 0)) AS total_votes,
+         min(p.min_price) AS min_price,
+         max(p.max_price) AS max_price,
+         count(p) AS product_count
+    SET b.avg_rating = CASE WHEN review_count > 0 THEN rating_sum / review_count END,
+        b.review_count = review_count,
+        b.total_votes = total_votes,
+        b.min_price = min_price,
+        b.max_price = max_price,
+        b.product_count = product_count
+"""
+
+def _all_names(session, label):
+    return [r["name"] for r in session.run(f"MATCH (n:{label}) RETURN n.name AS name")]
+
+def _run_batched(session, query, names):
+    names = sorted(names)
+    for start in range(0, len(names), AGG_BATCH):
+        session.run(query, {"names": names[start:start + AGG_BATCH]}).consume()
+
+def aggregate_graph(driver, products=None, brands=None):
+    # products/brands: names touched by the last load, or None for all
+    started = time.perf_counter()
+
+    with driver.session() as session:
+        if products is None:
+            products = _all_names(session, "Product")
+        if brands is None:
+            brands = _all_names(session, "Brand")
+
+        _run_batched(session, PRODUCT_AGGREGATES, products)
+        _run_batched(session, BRAND_AGGREGATES, brands)
+
+    # Aggregates (and so cached Cypher results) changed
+    bump_version("graph")
+
+    elapsed = time.perf_counter() - started
+    print(f"📈 Aggregates refreshed for {len(products)} products / {len(brands)} brands in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    from offline.load_graph import driver
+    aggregate_graph(driver)
@@ -1,10 +1,14 @@
 #clean_data.py
 import pandas as pd
 import os
+import sys
 
 # ---------------- CONFIG ----------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(BASE_DIR)
+from offline.versions import bump_version
+
 RAW_PATH = os.path.join(
     BASE_DIR, "data", "raw", "Amazon_Unlocked_Mobile.csv"
 )
@@ -13,26 +17,43 @@ CLEAN_PATH = os.path.join(
     BASE_DIR, "data", "cleaned", "amazon_reviews_cleaned.csv"
 )
 
-def clean_data():
-    print("📥 Loading raw dataset...")
-    df = pd.read_csv(RAW_PATH, low_memory=False)
+CLEAN_PARQUET_PATH = os.path.join(
+    BASE_DIR, "data", "cleaned", "amazon_reviews_cleaned.parquet"
+)
+
+# Raw rows per chunk in streaming mode (bounds peak memory)
+CHUNK_SIZE = 100_000
+# Also write the legacy CSV next to the Parquet output
+WRITE_CSV = True
+
+RAW_COLUMNS = {
+    "Product Name": "product",
+    "Brand Name": "brand",
+    "Price": "price",
+    "Rating": "rating",
+    "Reviews": "review_text",
+    "Review Votes": "votes"
+}
 
-    print(f"📊 Initial row count: {len(df)}")
+# Everything is read as text and coerced below, so malformed numeric
+# cells become NaN instead of failing the whole chunk
+RAW_DTYPES = {col: "string" for col in RAW_COLUMNS}
 
-    df = df.rename(columns={
-        "Product Name": "product",
-        "Brand Name": "brand",
-        "Price": "price",
-        "Rating": "rating",
-        "Reviews": "review_text",
-        "Review Votes": "votes"
-    })
+CLEAN_DTYPES = {
+    "product": "string",
+    "brand": "string",
+    "price": "float64",
+    "rating": "int8",
+    "review_text": "string",
+    "votes": "int32"
+}
+
+def clean_frame(df):
+    df = df.rename(columns=RAW_COLUMNS)
 
     mandatory_columns = ["product", "brand", "review_text", "rating"]
     df = df.dropna(subset=mandatory_columns)
 
-    print(f"🧹 After dropping mandatory fields: {len(df)}")
-
     df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
     df["votes"] = pd.to_numeric(df["votes"], errors="coerce").fillna(0)
     df["price"] = pd.to_numeric(df["price"], errors="coerce")
@@ -42,10 +63,94 @@ def clean_data():
     df["review_text"] = df["review_text"].astype(str).str.strip()
     df["review_text"] = df["review_text"].str.slice(0, 1000)
 
-    df.reset_index(drop=True, inplace=True)
+    return df[list(CLEAN_DTYPES)].astype(CLEAN_DTYPES)
+
+def _parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("product", pa.string()),
+        ("brand", pa.string()),
+        ("price", pa.float64()),
+        ("rating", pa.int8()),
+        ("review_text", pa.string()),
+        ("votes", pa.int32())
+    ])
+
+def clean_data(raw_path=RAW_PATH, parquet_path=CLEAN_PARQUET_PATH,
+               csv_path=CLEAN_PATH, chunksize=CHUNK_SIZE, write_csv=WRITE_CSV):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    print("📥 Streaming raw dataset...")
+    schema = _parquet_schema()
+    total_in = 0
+    total_out = 0
+
+    # Write next to the targets and swap in only on success: an
+    # interrupted run must not leave a valid-looking, truncated file that
+    # incremental builds would read as "the other reviews were removed"
+    parquet_tmp = parquet_path + ".tmp"
+    csv_tmp = csv_path + ".tmp"
+    if write_csv and os.path.exists(csv_tmp):
+        os.remove(csv_tmp)
+
+    with pq.ParquetWriter(parquet_tmp, schema) as writer:
+        chunks = pd.read_csv(
+            raw_path,
+            usecols=list(RAW_COLUMNS),
+            dtype=RAW_DTYPES,
+            chunksize=chunksize
+        )
+        for chunk in chunks:
+            total_in += len(chunk)
+            df = clean_frame(chunk)
+            total_out += len(df)
+
+            writer.write_table(
+                pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            )
+            if write_csv:
+                df.to_csv(
+                    csv_tmp, mode="a", index=False,
+                    header=not os.path.exists(csv_tmp)
+                )
+            print(f"🧹 {total_in} raw rows → {total_out} cleaned")
+
+    os.replace(parquet_tmp, parquet_path)
+    if write_csv:
+        if not os.path.exists(csv_tmp):
+            pd.DataFrame(columns=list(CLEAN_DTYPES)).to_csv(csv_tmp, index=False)
+        os.replace(csv_tmp, csv_path)
+    # Row positions (and so rev_{idx:08d} ids) may have moved
+    bump_version("cleaned")
+
+    print(f"📊 Initial row count: {total_in}")
+    print(f"🧹 After cleaning: {total_out}")
+    print("✅ Cleaned data saved to:", parquet_path)
+    if write_csv:
+        print("✅ CSV copy saved to:", csv_path)
+
+def read_cleaned(columns=None):
+    # Prefer the typed Parquet output; fall back to the legacy CSV.
+    # Row order (and so rev_{idx:08d} ids) is identical in both.
+    if os.path.exists(CLEAN_PARQUET_PATH):
+        return pd.read_parquet(CLEAN_PARQUET_PATH, columns=columns)
+    return pd.read_csv(CLEAN_PATH, usecols=columns)
 
-    df.to_csv(CLEAN_PATH, index=False)
-    print("✅ Cleaned data saved to:", CLEAN_PATH)
+def iter_cleaned(batch_size, columns=None):
+    # Same rows as read_cleaned(), one DataFrame of up to batch_size rows
+    # at a time; the index keeps counting across batches so ids match
+    if os.path.exists(CLEAN_PARQUET_PATH):
+        import pyarrow.parquet as pq
+        offset = 0
+        for batch in pq.ParquetFile(CLEAN_PARQUET_PATH).iter_batches(batch_size, columns=columns):
+            df = batch.to_pandas()
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            yield df
+        return
+    # read_csv chunks already carry a running RangeIndex
+    yield from pd.read_csv(CLEAN_PATH, usecols=columns, chunksize=batch_size)
 
 if __name__ == "__main__":
     clean_data()
@@ -0,0 +1,174 @@
+#ingest.py
+import os
+import sys
+import time
+import queue
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(BASE_DIR)
+from offline.clean_data import clean_data, iter_cleaned
+from offline import load_graph
+from offline.aggregate_graph import aggregate_graph
+from vectorstore import build_chroma
+from vectorstore.review_store import ReviewStoreWriter
+
+# ---------------- CONFIG ----------------
+# Rows per record batch handed to every stage
+BATCH_SIZE = 5000
+# Batches a stage may fall behind the reader before the reader blocks
+QUEUE_DEPTH = 8
+# Seconds between progress lines
+PROGRESS_EVERY = 10
+
+DONE = None
+
+# ---------------- STAGES ----------------
+class Stage:
+    # One consumer of the record stream, with its own bounded queue
+
+    def __init__(self, name, run):
+        self.name = name
+        self.run = run
+        self.queue = queue.Queue(maxsize=QUEUE_DEPTH)
+        self.rows = 0
+        self.started = None
+        self.elapsed = None
+        self.completed = False
+        self.error = None
+
+    def batches(self, stop):
+        while not stop.is_set():
+            try:
+                batch = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if batch is DONE:
+                self.completed = True
+                return
+            self.rows += len(batch)
+            yield batch
+
+    def rate(self):
+        elapsed = self.elapsed or (time.perf_counter() - self.started)
+        return self.rows / max(elapsed, 1e-9)
+
+def graph_stage(stage, stop, writers=load_graph.WRITERS):
+    load_graph.create_schema()
+    rows = (load_graph.to_rows(df) for df in stage.batches(stop))
+    _, _, touched = load_graph.write_batches(rows, writers)
+    aggregate_graph(load_graph.driver, touched["products"], touched["brands"])
+
+def vector_stage(stage, stop, incremental=True):
+    collection, manifest = build_chroma.open_index(incremental)
+    embedding = build_chroma.get_embedding()
+    seen = set()
+
+    def embed_batches():
+        for df in stage.batches(stop):
+            current = build_chroma.review_entries(df)
+            seen.update(current)
+            changed = build_chroma.changed_reviews(current, manifest)
+            build_chroma.drop_stale(collection, manifest, changed)
+            yield from build_chroma.iter_embed_batches(current, changed)
+
+    build_chroma.embed_and_write(collection, embedding, embed_batches(), manifest)
+
+    # A partial stream must not be mistaken for "reviews were removed";
+    # leave the in-progress marker so the next run resumes instead
+    if stage.completed:
+        build_chroma.close_index(collection, manifest, seen)
+
+def store_stage(stage, stop):
+    writer = ReviewStoreWriter()
+    for df in stage.batches(stop):
+        writer.append(df)
+    if stage.completed:
+        writer.close()
+
+# ---------------- PIPELINE ----------------
+def _put(stage, item, stop):
+    while not stop.is_set() and stage.error is None:
+        try:
+            stage.queue.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+def _run_stage(stage, stop):
+    stage.started = time.perf_counter()
+    try:
+        stage.run(stage, stop)
+    except Exception as e:
+        stage.error = e
+        stop.set()
+    finally:
+        stage.elapsed = time.perf_counter() - stage.started
+
+def _report(stages, started, finished):
+    while not finished.wait(PROGRESS_EVERY):
+        elapsed = time.perf_counter() - started
+        parts = [
+            f"{s.name}: {s.rows} rows ({s.rate():,.0f}/s, queue {s.queue.qsize()})"
+            for s in stages
+        ]
+        print(f"⏱️  {elapsed:.0f}s | " + " | ".join(parts))
+
+def ingest(clean=False, incremental=True, writers=load_graph.WRITERS, batch_size=BATCH_SIZE):
+    started = time.perf_counter()
+    timings = {}
+
+    if clean:
+        clean_data()
+        timings["clean"] = time.perf_counter() - started
+
+    stages = [
+        Stage("graph", lambda s, stop: graph_stage(s, stop, writers)),
+        Stage("vector", lambda s, stop: vector_stage(s, stop, incremental)),
+        Stage("store", store_stage),
+    ]
+    stop = threading.Event()
+    finished = threading.Event()
+
+    threads = [threading.Thread(target=_run_stage, args=(s, stop), name=s.name) for s in stages]
+    threads.append(threading.Thread(target=_report, args=(stages, started, finished), daemon=True))
+    for t in threads:
+        t.start()
+
+    # Stream the cleaned file once and fan out: every stage sees every
+    # batch, and the slowest queue sets the pace (and so bounds memory)
+    rows = 0
+    for batch in iter_cleaned(batch_size):
+        rows += len(batch)
+        for stage in stages:
+            _put(stage, batch, stop)
+        if stop.is_set():
+            break
+    for stage in stages:
+        _put(stage, DONE, stop)
+    print(f"📥 {rows} cleaned rows streamed in batches of {batch_size}")
+
+    for t in threads[:-1]:
+        t.join()
+    finished.set()
+
+    total = time.perf_counter() - started
+    print("\n📊 Stage timings")
+    for name, elapsed in timings.items():
+        print(f"  {name:<8} {elapsed:8.1f}s")
+    for s in stages:
+        status = "failed" if s.error else "ok" if s.completed else "stopped"
+        print(f"  {s.name:<8} {s.elapsed:8.1f}s  {s.rows} rows  {s.rate():,.0f} rows/sec  [{status}]")
+    print(f"  {'total':<8} {total:8.1f}s")
+
+    errors = [s for s in stages if s.error]
+    for s in errors:
+        print(f"❌ {s.name} stage failed:", s.error)
+    if errors:
+        raise errors[0].error
+
+    print("✅ Ingestion complete")
+
+if __name__ == "__main__":
+    ingest(clean="--clean" in sys.argv, incremental="--full" not in sys.argv)
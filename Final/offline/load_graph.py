@@ -1,68 +1,179 @@
 #load_graph.py
 import pandas as pd
 import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from neo4j import GraphDatabase
 
 # ---------------- PATH CONFIG ----------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-CLEAN_PATH = os.path.join(
-    BASE_DIR, "data", "cleaned", "amazon_reviews_cleaned.csv"
-)
+sys.path.append(BASE_DIR)
+from offline.clean_data import read_cleaned
+from offline.aggregate_graph import aggregate_graph
 
 # ---------------- NEO4J CONFIG ----------------
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
-NEO4J_PASSWORD = "Aigurukul@2.0" 
+NEO4J_PASSWORD = "Aigurukul@2.0"
 
 driver = GraphDatabase.driver(
     NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)
 )
 
+# ---------------- LOAD CONFIG ----------------
+# Rows shipped per UNWIND transaction
+BATCH_SIZE = 5000
+# Parallel writer sessions. Batches touching the same Brand/Product
+# can contend for locks, so keep this small (1-4).
+WRITERS = 1
+# Print throughput every N rows
+PROGRESS_EVERY = 50000
+
+# ---------------- SCHEMA ----------------
+# Uniqueness constraints give MERGE an index lookup instead of a label
+# scan, and make review_id the identity that keeps reloads idempotent
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT brand_name IF NOT EXISTS FOR (b:Brand) REQUIRE b.name IS UNIQUE",
+    "CREATE CONSTRAINT product_name IF NOT EXISTS FOR (p:Product) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT review_id IF NOT EXISTS FOR (r:Review) REQUIRE r.review_id IS UNIQUE",
+    "CREATE INDEX review_rating IF NOT EXISTS FOR (r:Review) ON (r.rating)",
+]
+
+# Loaders before the review_id constraint used CREATE, so a database
+# loaded twice holds several identical Review nodes per review_id and the
+# constraint cannot be created. Keep one per id; the extras are deleted
+# with their HAS_REVIEW edges (the kept node has its own).
+DEDUPE_REVIEWS = """
+    MATCH (r:Review)
+    WHERE r.review_id IS NOT NULL
+    WITH r.review_id AS review_id, collect(r) AS nodes
+    WHERE size(nodes) > 1
+    UNWIND nodes[1..] AS extra
+    CALL {
+        WITH extra
+        DETACH DELETE extra
+    } IN TRANSACTIONS OF 10000 ROWS
+    RETURN count(*) AS removed
+"""
+
+def dedupe_reviews(session):
+    # Only needed once: with the constraint in place duplicates cannot exist
+    exists = session.run(
+        "SHOW CONSTRAINTS YIELD name WHERE name = 'review_id' RETURN count(*) AS n"
+    ).single()["n"]
+    if exists:
+        return 0
+    removed = session.run(DEDUPE_REVIEWS).single()["removed"]
+    if removed:
+        print(f"🧹 Removed {removed} duplicate Review nodes left by the old loader")
+    return removed
+
+def create_schema():
+    with driver.session() as session:
+        dedupe_reviews(session)
+        for statement in SCHEMA_STATEMENTS:
+            session.run(statement).consume()
+        session.run("CALL db.awaitIndexes(300)").consume()
+    print("🧱 Schema constraints and indexes ready")
+
 # ---------------- CYPHER WRITE FUNCTION ----------------
-def create_graph(tx, brand, product, price, review_id, rating, votes):
-    tx.run("""
-        MERGE (b:Brand {name: $brand})
-        MERGE (p:Product {name: $product})
-        SET p.price = $price
-        MERGE (b)-[:MAKES]->(p)
-        CREATE (r:Review {
-            review_id: $review_id,
-            rating: $rating,
-            votes: $votes
+CREATE_GRAPH_BATCH = """
+    UNWIND $rows AS row
+    MERGE (b:Brand {name: row.brand})
+    MERGE (p:Product {name: row.product})
+    SET p.price = row.price
+    MERGE (b)-[:MAKES]->(p)
+    MERGE (r:Review {review_id: row.review_id})
+    SET r.rating = row.rating,
+        r.votes = row.votes,
+        r.price = row.price
+    MERGE (p)-[:HAS_REVIEW]->(r)
+"""
+
+def create_graph_batch(tx, rows):
+    tx.run(CREATE_GRAPH_BATCH, {"rows": rows})
+
+def _clean_value(value):
+    # Neo4j parameters cannot carry pandas NaN as "missing"
+    return None if pd.isna(value) else value
+
+def to_rows(df):
+    rows = []
+    for idx, brand, product, price, rating, votes in zip(
+        df.index, df["brand"], df["product"],
+        df["price"], df["rating"], df["votes"]
+    ):
+        rows.append({
+            "review_id": f"rev_{idx:08d}",
+            "brand": brand,
+            "product": product,
+            "price": _clean_value(price),
+            "rating": _clean_value(rating),
+            "votes": _clean_value(votes)
         })
-        MERGE (p)-[:HAS_REVIEW]->(r)
-    """, {
-        "brand": brand,
-        "product": product,
-        "price": price,
-        "review_id": review_id,
-        "rating": rating,
-        "votes": votes
-    })
+    return rows
+
+def iter_batches(df, batch_size=BATCH_SIZE):
+    for start in range(0, len(df), batch_size):
+        yield to_rows(df.iloc[start:start + batch_size])
+
+def write_batches(batches, writers=WRITERS):
+    # Each writer owns one session and pulls batches until exhausted
+    batches = iter(batches)
+    lock = threading.Lock()
+    stats = {"rows": 0, "next_report": PROGRESS_EVERY}
+    touched = {"products": set(), "brands": set()}
+    started = time.perf_counter()
+
+    def next_batch():
+        with lock:
+            return next(batches, None)
+
+    def report(rows):
+        with lock:
+            touched["products"].update(r["product"] for r in rows)
+            touched["brands"].update(r["brand"] for r in rows)
+            stats["rows"] += len(rows)
+            if stats["rows"] >= stats["next_report"]:
+                elapsed = time.perf_counter() - started
+                print(f"⏱️  {stats['rows']} rows — {stats['rows'] / elapsed:,.0f} rows/sec")
+                stats["next_report"] += PROGRESS_EVERY
+
+    def writer():
+        with driver.session() as session:
+            while True:
+                rows = next_batch()
+                if rows is None:
+                    return
+                session.execute_write(create_graph_batch, rows)
+                report(rows)
+
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        for f in [pool.submit(writer) for _ in range(writers)]:
+            f.result()
+
+    elapsed = time.perf_counter() - started
+    return stats["rows"], elapsed, touched
 
 # ---------------- LOAD DATA ----------------
-def load_graph():
+def load_graph(batch_size=BATCH_SIZE, writers=WRITERS):
     print("📥 Loading cleaned data...")
-    df = pd.read_csv(CLEAN_PATH)
+    df = read_cleaned(columns=["brand", "product", "price", "rating", "votes"])
 
-    print(f"📊 Rows to insert: {len(df)}")
+    print(f"📊 Rows to insert: {len(df)} (batch={batch_size}, writers={writers})")
 
-    with driver.session() as session:
-        for idx, row in df.iterrows():
-            review_id = f"rev_{idx:08d}"
-
-            session.execute_write(
-                create_graph,
-                row["brand"],
-                row["product"],
-                row.get("price"),
-                review_id,
-                row["rating"],
-                row["votes"]
-            )
-
-    print("✅ Graph loaded successfully")
+    create_schema()
+
+    total, elapsed, touched = write_batches(iter_batches(df, batch_size), writers)
+
+    print(f"✅ Graph loaded successfully — {total} rows in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+    # Only products/brands that received reviews need new aggregates
+    aggregate_graph(driver, touched["products"], touched["brands"])
 
 if __name__ == "__main__":
     load_graph()
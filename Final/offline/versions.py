@@ -0,0 +1,27 @@
+#versions.py
+import os
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VERSION_DIR = os.path.join(BASE_DIR, "data")
+
+# Offline builds bump a stamp; online caches compare it to decide
+# whether what they hold is still valid. Names: "graph", "vector",
+# "cleaned" (the cleaned dataset the review store was built from).
+def _path(name):
+    return os.path.join(VERSION_DIR, f"{name}.version")
+
+def bump_version(name):
+    os.makedirs(VERSION_DIR, exist_ok=True)
+    tmp = _path(name) + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp, _path(name))
+
+def read_version(name):
+    try:
+        with open(_path(name)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return "0"
@@ -0,0 +1,158 @@
+#api.py
+import os
+import sys
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from agents.agents import arun_pipeline, astream_pipeline, warm_up
+# Same module object agents.py records into (it imports siblings flat)
+from tracing import metrics_text
+
+# ---------------- CONFIG ----------------
+# Pipelines running at once (match OLLAMA_NUM_PARALLEL)
+MAX_CONCURRENT = int(os.getenv("RAG_MAX_CONCURRENT", "4"))
+# Requests allowed to wait for a slot before new ones get 503
+MAX_QUEUE = int(os.getenv("RAG_MAX_QUEUE", "32"))
+# Default end-to-end deadline per request (seconds), queueing included
+DEFAULT_DEADLINE = float(os.getenv("RAG_DEADLINE", "90"))
+
+@asynccontextmanager
+async def lifespan(app):
+    # Build the shared clients and load the Ollama models before serving
+    if os.getenv("RAG_WARM_UP", "1") == "1":
+        await asyncio.to_thread(warm_up)
+    yield
+
+api = FastAPI(title="Hybrid Graph + Vector RAG", lifespan=lifespan)
+
+slots = asyncio.Semaphore(MAX_CONCURRENT)
+stats = {"in_flight": 0, "queued": 0, "served": 0, "rejected": 0, "timed_out": 0, "failed": 0}
+
+class AskRequest(BaseModel):
+    query: str
+    deadline: float | None = None
+
+def _public(result):
+    return {
+        "query": result.get("query"),
+        "answer": result.get("answer", ""),
+        "recommendation": result.get("recommendation", ""),
+        "validated": result.get("validated"),
+        "cached": result.get("cached", False),
+        "timings": result.get("timings")
+    }
+
+async def _acquire(deadline_at):
+    # Bounded queue in front of the semaphore: shed load instead of
+    # letting waiters pile up past what we can serve before deadlines
+    if stats["queued"] >= MAX_QUEUE:
+        stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Server busy, retry later")
+
+    stats["queued"] += 1
+    try:
+        await asyncio.wait_for(slots.acquire(), max(deadline_at - time.monotonic(), 0))
+    except asyncio.TimeoutError:
+        stats["timed_out"] += 1
+        raise HTTPException(status_code=504, detail="Deadline exceeded while queued")
+    finally:
+        stats["queued"] -= 1
+    stats["in_flight"] += 1
+
+def _release():
+    stats["in_flight"] -= 1
+    slots.release()
+
+class SlotStreamingResponse(StreamingResponse):
+    # Owns a slot taken by _acquire: released when the response finishes,
+    # fails or the client goes away, even if the body never started
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _release()
+
+@api.get("/health")
+async def health():
+    return {"status": "ok", "max_concurrent": MAX_CONCURRENT, **stats}
+
+@api.get("/metrics")
+async def metrics():
+    # Prometheus scrape endpoint: node, LLM, Neo4j and Chroma latencies
+    # plus token counters, recorded by agents/tracing.py
+    lines = [metrics_text()]
+    for key, value in stats.items():
+        kind = "gauge" if key in ("in_flight", "queued") else "counter"
+        name = f"rag_service_{key}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {name} {kind}\n{name} {value}\n")
+    return PlainTextResponse("".join(lines), media_type="text/plain; version=0.0.4")
+
+@api.post("/ask")
+async def ask(req: AskRequest):
+    started = time.monotonic()
+    deadline_at = started + (req.deadline or DEFAULT_DEADLINE)
+
+    await _acquire(deadline_at)
+    try:
+        result = await asyncio.wait_for(
+            arun_pipeline(req.query), max(deadline_at - time.monotonic(), 0)
+        )
+    except asyncio.TimeoutError:
+        stats["timed_out"] += 1
+        raise HTTPException(status_code=504, detail="Deadline exceeded")
+    finally:
+        _release()
+
+    stats["served"] += 1
+    return {**_public(result), "elapsed": round(time.monotonic() - started, 3)}
+
+@api.post("/ask/stream")
+async def ask_stream(req: AskRequest):
+    # NDJSON: {"token": ...} lines while answering, then {"result": {...}}
+    started = time.monotonic()
+    deadline_at = started + (req.deadline or DEFAULT_DEADLINE)
+
+    await _acquire(deadline_at)
+
+    async def events():
+        stream = astream_pipeline(req.query)
+        try:
+            while True:
+                remaining = max(deadline_at - time.monotonic(), 0)
+                try:
+                    kind, payload = await asyncio.wait_for(stream.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    stats["timed_out"] += 1
+                    yield json.dumps({"error": "Deadline exceeded"}) + "\n"
+                    break
+                except Exception as e:
+                    # The status line is already sent: report in-band so the
+                    # client gets a complete body instead of a cut-off stream
+                    stats["failed"] += 1
+                    yield json.dumps({"error": f"Pipeline failed: {e}"}) + "\n"
+                    break
+
+                if kind == "token":
+                    yield json.dumps({"token": payload}) + "\n"
+                elif kind == "node":
+                    yield json.dumps({"node": payload}) + "\n"
+                else:
+                    stats["served"] += 1
+                    result = {**_public(payload), "elapsed": round(time.monotonic() - started, 3)}
+                    yield json.dumps({"result": result}) + "\n"
+        finally:
+            await stream.aclose()
+
+    return SlotStreamingResponse(events(), media_type="application/x-ndjson")
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(api, host=os.getenv("RAG_HOST", "127.0.0.1"), port=int(os.getenv("RAG_PORT", "8000")))
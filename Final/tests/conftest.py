@@ -0,0 +1,17 @@
+import os
+import sys
+
+# agents/*.py import their siblings flat (see agents.py), so tests do too
+FINAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(FINAL_DIR)
+sys.path.append(os.path.join(FINAL_DIR, "agents"))
+
+import pytest
+
+from offline import versions
+
+@pytest.fixture(autouse=True)
+def version_dir(tmp_path, monkeypatch):
+    # Builds bump version stamps; keep them out of Final/data
+    monkeypatch.setattr(versions, "VERSION_DIR", str(tmp_path / "versions"))
+    return versions.VERSION_DIR
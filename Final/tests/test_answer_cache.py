@@ -0,0 +1,35 @@
+from answer_cache import SemanticCache
+from cypher_templates import find_brands, find_limit, find_order
+
+BRANDS = ["Samsung", "Nokia"]
+
+def signature(query):
+    return tuple(sorted(find_brands(query, BRANDS))), find_limit(query), find_order(query)
+
+def test_near_duplicate_with_other_brand_misses():
+    cache = SemanticCache(threshold=0.92)
+    vector = [1.0, 0.0, 0.0]
+    near = [0.99, 0.05, 0.0]      # cosine ≈ 0.999
+
+    cache.store(vector, {"answer": "samsung"}, signature("Top 5 Samsung phones"))
+
+    assert cache.lookup(near, signature("Top 5 Nokia phones")) is None
+    assert cache.lookup(near, signature("Top 5 Samsung phones"))["answer"] == "samsung"
+
+def test_opposite_superlative_misses():
+    cache = SemanticCache(threshold=0.92)
+    cache.store([1.0, 0.0], {"answer": "best"}, signature("highest rated brand"))
+    assert cache.lookup([1.0, 0.0], signature("lowest rated brand")) is None
+
+def test_best_match_among_same_signature():
+    cache = SemanticCache(threshold=0.5)
+    cache.store([1.0, 0.0], {"answer": "nokia"}, signature("Top 5 Nokia phones"))
+    cache.store([0.8, 0.6], {"answer": "samsung"}, signature("Top 5 Samsung phones"))
+    assert cache.lookup([1.0, 0.0], signature("Top 5 Samsung phones"))["answer"] == "samsung"
+
+def test_eviction_keeps_signatures_aligned():
+    cache = SemanticCache(threshold=0.9, max_size=1)
+    cache.store([1.0, 0.0], {"answer": "old"}, "a")
+    cache.store([0.0, 1.0], {"answer": "new"}, "b")
+    assert cache.lookup([1.0, 0.0], "a") is None
+    assert cache.lookup([0.0, 1.0], "b")["answer"] == "new"
@@ -0,0 +1,69 @@
+import sys
+import importlib
+from contextlib import contextmanager
+
+import pytest
+from langchain_core.documents import Document
+
+from agents import agents as pipeline
+
+@pytest.fixture
+def batch(monkeypatch):
+    # batch.py imports the pipeline module flat, as `agents`
+    monkeypatch.setitem(sys.modules, "agents", pipeline)
+    monkeypatch.delitem(sys.modules, "batch", raising=False)
+    return importlib.import_module("batch")
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+class FakeLLM:
+    # Fails every prompt that mentions `bad`
+    def __init__(self, bad, reply):
+        self.bad = bad
+        self.reply = reply
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        assert return_exceptions
+        return [RuntimeError("llm down") if self.bad in str(p) else Reply(self.reply) for p in prompts]
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(i + 1), 1.0] for i in range(len(texts))]
+
+class FakeVectors:
+    def similarity_search_by_vector(self, vector, k=5):
+        if vector[0] == 2.0:
+            raise ConnectionError("chroma down")
+        return [Document(page_content="solid phone", metadata={"review_id": "rev_00000000"})]
+
+@contextmanager
+def no_session(driver):
+    yield None
+
+def test_failures_stay_with_their_query(batch, monkeypatch):
+    monkeypatch.setattr(batch, "embeddings", FakeEmbeddings())
+    monkeypatch.setattr(batch, "vector_db", FakeVectors())
+    monkeypatch.setattr(batch, "format_vector_doc", lambda d: d.page_content)
+    monkeypatch.setattr(batch, "known_brands", lambda: [])
+    monkeypatch.setattr(batch, "query_signature", lambda q: q)
+    monkeypatch.setattr(batch, "read_session", no_session)
+    monkeypatch.setattr(batch, "execute_cypher", lambda *a, **kw: [])
+    monkeypatch.setattr(batch, "local_rank_node", lambda s: {"ranked_docs": s["docs"]})
+    monkeypatch.setattr(batch, "RANKER", "local")
+    monkeypatch.setattr(batch, "agent_llm", FakeLLM("gaming", "RETURN 1"))
+    monkeypatch.setattr(batch, "answer_llm", FakeLLM("camera", "An answer"))
+    monkeypatch.setattr(batch, "answer_cache", pipeline.SemanticCache())
+
+    records = list(batch.run_batch(["best camera phone", "phones for gaming", "top Nokia phones"]))
+
+    assert [r["query"] for r in records] == ["best camera phone", "phones for gaming", "top Nokia phones"]
+    assert records[0]["error"].startswith("answer:")
+    # Cypher, vector search and critic/recommend failures for query 2 are absorbed
+    # or reported on that record only
+    assert records[1]["answer"] == "An answer"
+    assert records[1]["cypher"]["error"] == "llm down"
+    assert records[1]["error"].endswith("llm down")
+    assert records[2]["error"] is None
+    assert records[2]["answer"] == "An answer"
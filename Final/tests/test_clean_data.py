@@ -0,0 +1,63 @@
+import pandas as pd
+
+from offline import clean_data
+
+def test_iter_cleaned_keeps_a_running_row_offset(tmp_path, monkeypatch):
+    path = tmp_path / "cleaned.parquet"
+    full = pd.DataFrame({"brand": [f"b{i}" for i in range(7)], "rating": range(7)})
+    full.to_parquet(path, index=False)
+    monkeypatch.setattr(clean_data, "CLEAN_PARQUET_PATH", str(path))
+
+    batches = list(clean_data.iter_cleaned(3))
+
+    assert [len(df) for df in batches] == [3, 3, 1]
+    assert [list(df.index) for df in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert pd.concat(batches)["brand"].tolist() == full["brand"].tolist()
+
+def test_iter_cleaned_selects_columns(tmp_path, monkeypatch):
+    path = tmp_path / "cleaned.parquet"
+    pd.DataFrame({"brand": ["a", "b"], "rating": [1, 2]}).to_parquet(path, index=False)
+    monkeypatch.setattr(clean_data, "CLEAN_PARQUET_PATH", str(path))
+
+    (df,) = clean_data.iter_cleaned(10, columns=["rating"])
+    assert list(df.columns) == ["rating"]
+
+RAW = """Product Name,Brand Name,Price,Rating,Reviews,Review Votes
+Galaxy S7,Samsung,500,5,great phone,1
+Lumia 950,Nokia,300,3,ok phone,0
+iPhone 6,Apple,400,4,nice,2
+"""
+
+def test_clean_data_replaces_outputs_on_success(tmp_path):
+    raw = tmp_path / "raw.csv"
+    raw.write_text(RAW)
+    parquet, csv = tmp_path / "clean.parquet", tmp_path / "clean.csv"
+
+    clean_data.clean_data(str(raw), str(parquet), str(csv), chunksize=2)
+
+    assert pd.read_parquet(parquet)["brand"].tolist() == ["Samsung", "Nokia", "Apple"]
+    assert len(pd.read_csv(csv)) == 3
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_interrupted_clean_keeps_previous_outputs(tmp_path, monkeypatch):
+    raw = tmp_path / "raw.csv"
+    raw.write_text(RAW)
+    parquet, csv = tmp_path / "clean.parquet", tmp_path / "clean.csv"
+    clean_data.clean_data(str(raw), str(parquet), str(csv), chunksize=2)
+
+    original = clean_data.clean_frame
+    calls = []
+    def failing(chunk):
+        calls.append(chunk)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return original(chunk)
+    monkeypatch.setattr(clean_data, "clean_frame", failing)
+
+    try:
+        clean_data.clean_data(str(raw), str(parquet), str(csv), chunksize=2)
+    except KeyboardInterrupt:
+        pass
+
+    assert len(pd.read_parquet(parquet)) == 3
+    assert len(pd.read_csv(csv)) == 3
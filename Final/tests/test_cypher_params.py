@@ -0,0 +1,32 @@
+from cypher_params import parameterize
+
+def test_strings_and_numbers_become_params():
+    cypher, params = parameterize("MATCH (b:Brand {name: 'Samsung'}) RETURN b LIMIT 5")
+    assert cypher == "MATCH (b:Brand {name: $lit_0}) RETURN b LIMIT $lit_1"
+    assert params == {"lit_0": "Samsung", "lit_1": 5}
+
+def test_leading_dot_float():
+    cypher, params = parameterize("MATCH (p) WHERE p.rating > .5 RETURN p")
+    assert cypher == "MATCH (p) WHERE p.rating > $lit_0 RETURN p"
+    assert params == {"lit_0": 0.5}
+
+def test_slice_bounds_are_separate_numbers():
+    cypher, params = parameterize("RETURN [1, 2, 3, 4][1..3]")
+    assert cypher.endswith("[$lit_0..$lit_2]")
+    assert params["lit_2"] == 3
+
+def test_multiplication_is_parameterized():
+    cypher, params = parameterize("MATCH (p:Product) RETURN p.price * 2, p.price*3")
+    assert cypher == "MATCH (p:Product) RETURN p.price * $lit_0, p.price*$lit_1"
+    assert params == {"lit_0": 2, "lit_1": 3}
+
+def test_variable_length_bounds_stay_literal():
+    for pattern in ("-[:REVIEWS*1..3]->", "<-[r:A|B*2]-", "-[*..4]-", "-[ * 1 .. 2 ]-"):
+        cypher, params = parameterize(f"MATCH (a){pattern}(b) RETURN b LIMIT 10")
+        assert cypher == f"MATCH (a){pattern}(b) RETURN b LIMIT $lit_0"
+        assert params == {"lit_0": 10}
+
+def test_existing_params_and_comments_are_kept():
+    cypher, params = parameterize("MATCH (b) // top 3\nWHERE b.name = $brand RETURN b", {"brand": "Nokia"})
+    assert cypher == "MATCH (b) // top 3\nWHERE b.name = $brand RETURN b"
+    assert params == {"brand": "Nokia"}
@@ -0,0 +1,63 @@
+from cypher_templates import match_template, find_order
+
+BRANDS = ["Samsung", "Apple", "Nokia"]
+
+def _order_by(cypher):
+    return next(line for line in cypher.splitlines() if line.startswith("ORDER BY"))
+
+def test_best_rated_brand_sorts_descending():
+    cypher, _ = match_template("Which brand has the best ratings?", BRANDS)
+    assert "MATCH (b:Brand)\n" in cypher
+    assert _order_by(cypher) == "ORDER BY avg_rating DESC"
+
+def test_worst_rated_brand_sorts_ascending():
+    cypher, _ = match_template("Which brand has the worst ratings?", BRANDS)
+    assert "MATCH (b:Brand)\n" in cypher
+    assert _order_by(cypher) == "ORDER BY avg_rating ASC"
+
+def test_lowest_rated_brand_sorts_ascending():
+    cypher, _ = match_template("Which brand has the lowest rating?", BRANDS)
+    assert _order_by(cypher) == "ORDER BY avg_rating ASC"
+
+def test_worst_rated_brand_products_use_product_query():
+    cypher, params = match_template("Worst rated Samsung phones", BRANDS)
+    assert "p.name AS product" in cypher
+    assert _order_by(cypher) == "ORDER BY avg_rating ASC, review_count DESC"
+    assert params["brands"] == ["Samsung"]
+
+def test_top_products_sort_descending():
+    cypher, params = match_template("Top 5 Nokia phones", BRANDS)
+    assert _order_by(cypher) == "ORDER BY avg_rating DESC, review_count DESC"
+    assert params == {"brands": ["Nokia"], "limit": 5}
+
+def test_most_expensive_brand_sorts_by_max_price_descending():
+    cypher, _ = match_template("Which brand is the most expensive?", BRANDS)
+    assert "b.max_price AS max_price" in cypher
+    assert _order_by(cypher) == "ORDER BY max_price DESC"
+
+def test_cheapest_brand_sorts_by_min_price_ascending():
+    cypher, _ = match_template("Which brand is the cheapest?", BRANDS)
+    assert _order_by(cypher) == "ORDER BY min_price"
+
+def test_find_order():
+    assert find_order("highest rated brand") == "desc"
+    assert find_order("lowest rated brand") == "asc"
+    assert find_order("most expensive Apple phone") == "desc"
+
+def test_unrelated_question_has_no_template():
+    assert match_template("What do reviewers say about battery life?", BRANDS) is None
+
+def test_feature_and_price_limits_have_no_template():
+    for question in (
+        "What is the best camera phone under $300?",
+        "Which phone has the best battery life?",
+        "Do people recommend Samsung phones for gaming?",
+        "Are Apple phones worth the price?",
+        "What are the best budget phones?",
+    ):
+        assert match_template(question, BRANDS) is None, question
+
+def test_brand_phone_prices_still_match():
+    cypher, params = match_template("What are Samsung phone prices?", BRANDS)
+    assert "b.min_price AS min_price" in cypher
+    assert params["brands"] == ["Samsung"]
@@ -0,0 +1,20 @@
+from agents import agents
+
+class DownEmbeddings:
+    def embed_query(self, text):
+        raise ConnectionError("embed endpoint down")
+
+class FakeApp:
+    def invoke(self, state, config=None):
+        return {**state, "answer": "Samsung"}
+
+def test_failed_embedding_skips_the_cache(monkeypatch):
+    stored = []
+    monkeypatch.setattr(agents, "embeddings", DownEmbeddings())
+    monkeypatch.setattr(agents, "app", FakeApp())
+    monkeypatch.setattr(agents.answer_cache, "store", lambda *args: stored.append(args))
+
+    result = agents.run_pipeline("Top 5 Samsung phones")
+
+    assert result["answer"] == "Samsung"
+    assert stored == []
@@ -0,0 +1,34 @@
+import numpy as np
+from reranker import rank_context
+
+def _vectors(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, 8)).tolist()
+
+def test_graph_rows_kept_whole_and_in_order():
+    graph = [f"Brand B{i} has average rating {5 - i * 0.1:.1f} from 100 reviews" for i in range(20)]
+    docs = [f"Brand:B{i} Product:P{i} Review:battery review {i}" for i in range(5)]
+
+    ranked = rank_context(
+        "Which brand has the highest average rating?", graph, docs, docs,
+        _vectors(1)[0], _vectors(len(docs), seed=1), top_k=5, min_docs=2
+    )
+
+    assert ranked[:20] == graph
+    assert len(ranked) == 22
+    assert set(ranked[20:]) <= set(docs)
+
+def test_vector_docs_fill_remaining_slots_by_score():
+    graph = ["Brand B0 has average rating 4.9 from 100 reviews"]
+    docs = ["Brand:A Product:X Review:screen cracked", "Brand:A Product:Y Review:great battery life"]
+    query_vector = [1.0, 0.0]
+    doc_vectors = [[0.0, 1.0], [1.0, 0.0]]
+
+    ranked = rank_context("battery life", graph, docs, docs, query_vector, doc_vectors, top_k=5)
+
+    assert ranked == [graph[0], docs[1], docs[0]]
+
+def test_no_graph_rows():
+    docs = ["a battery", "b screen", "c camera"]
+    ranked = rank_context("battery", [], docs, docs, [1.0, 0.0], [[1, 0], [0, 1], [0, 1]], top_k=2)
+    assert ranked[0] == "a battery" and len(ranked) == 2
@@ -0,0 +1,28 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents import agents
+
+def test_queue_time_does_not_count_against_the_budget():
+    pool = ThreadPoolExecutor(max_workers=1)
+    blocker = agents._submit_branch(pool, lambda q: time.sleep(0.2), "slow")
+    branch = agents._submit_branch(pool, lambda q: ["hit"], "fast")
+
+    # Queued for 0.2s behind the blocker, then runs well within 0.3s
+    assert agents._branch_result("Vector", branch, 0.3, []) == ["hit"]
+    blocker[0].result()
+
+def test_branch_that_never_starts_times_out_and_is_cancelled():
+    pool = ThreadPoolExecutor(max_workers=1)
+    blocker = agents._submit_branch(pool, lambda q: time.sleep(0.3), "slow")
+    branch = agents._submit_branch(pool, lambda q: ["hit"], "fast")
+
+    assert agents._branch_result("Vector", branch, 0.05, []) == []
+    assert branch[0].cancelled()
+    blocker[0].result()
+
+def test_running_branch_past_its_budget_is_dropped():
+    pool = ThreadPoolExecutor(max_workers=1)
+    branch = agents._submit_branch(pool, lambda q: time.sleep(0.2) or ["late"], "slow")
+    assert agents._branch_result("Graph", branch, 0.05, ([], {})) == ([], {})
+    branch[0].result()
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from offline.versions import bump_version
+from vectorstore.review_store import ReviewStore, ReviewStoreWriter
+
+def _build(path):
+    df = pd.DataFrame({
+        "brand": ["Samsung", "Nokia"],
+        "product": ["Galaxy S7", "Lumia 950"],
+        "price": [500.0, None],
+        "rating": [5, 3],
+        "votes": [1, 0],
+        "review_text": ["great phone", "ok phone"],
+    })
+    writer = ReviewStoreWriter(str(path))
+    writer.append(df)
+    writer.close()
+
+def test_lookup_by_review_id(tmp_path):
+    _build(tmp_path / "store")
+    review = ReviewStore(str(tmp_path / "store")).get("rev_00000001")
+    assert review["brand"] == "Nokia"
+    assert review["price"] is None
+    assert review["review_text"] == "ok phone"
+
+def test_store_from_older_cleaned_data_is_not_used(tmp_path):
+    _build(tmp_path / "store")
+    store = ReviewStore(str(tmp_path / "store"))
+    assert store.get("rev_00000000") is not None
+
+    bump_version("cleaned")
+
+    assert store.get("rev_00000000") is None
@@ -0,0 +1,44 @@
+import json
+import importlib.util
+
+import tracing
+
+def _finish(query="Top 5 Samsung phones"):
+    trace = tracing.new_trace(query)
+    with tracing.activate(trace), tracing.span("neo4j.query", kind="neo4j",
+                                                cypher="RETURN $lit_0", params={"lit_0": 5}):
+        pass
+    return trace
+
+def test_traces_are_not_written_by_default(monkeypatch):
+    # Load a separate copy so the shared module keeps its state
+    monkeypatch.delenv("RAG_TRACE_PATH", raising=False)
+    spec = importlib.util.spec_from_file_location("tracing_defaults", tracing.__file__)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+    assert fresh.TRACE_PATH == ""
+
+def test_written_traces_drop_query_and_params(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    writer = tracing.TraceWriter()
+    monkeypatch.setattr(tracing, "TRACE_PATH", str(path))
+    monkeypatch.setattr(tracing, "_writer", writer)
+
+    tracing.end_trace(_finish())
+    writer.close()
+
+    (line,) = path.read_text().splitlines()
+    data = json.loads(line)
+    assert data["query"] is None
+    assert data["spans"][0]["attrs"] == {"cypher": "RETURN $lit_0"}
+    assert tracing.last_trace()["query"] == "Top 5 Samsung phones"
+
+def test_trace_file_is_rotated(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    path.write_text("x" * 100)
+    monkeypatch.setattr(tracing, "TRACE_MAX_BYTES", 64)
+
+    tracing._append(str(path), "new\n")
+
+    assert path.read_text() == "new\n"
+    assert (tmp_path / "traces.jsonl.1").read_text() == "x" * 100
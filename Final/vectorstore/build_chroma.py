@@ -1,51 +1,255 @@
 #build_chroma.py
 import os
+import sys
+import json
+import time
 import shutil
-import pandas as pd
-from langchain_core.documents import Document
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import chromadb
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-CLEAN_PATH = os.path.join(BASE_DIR, "data", "cleaned", "amazon_reviews_cleaned.csv")
+sys.path.append(BASE_DIR)
+from offline.clean_data import read_cleaned
+from offline.versions import bump_version
+from vectorstore.embedding_cache import cached_ollama_embeddings
+
 CHROMA_DIR = os.path.join(BASE_DIR, "vectorstore", "chroma_amazon_reviews")
+# review_id -> {"hash": content hash, "chunks": chunk count}
+MANIFEST_PATH = os.path.join(CHROMA_DIR, "manifest.json")
+# Changes since the last compaction, one JSON line each: [review_id, entry]
+# for an embedded review, [review_id, null] for a dropped one
+JOURNAL_PATH = os.path.join(CHROMA_DIR, "manifest.journal")
+# Present while a build is running; a leftover marker means "resume"
+IN_PROGRESS_PATH = os.path.join(CHROMA_DIR, ".build_in_progress")
 
 EMBED_MODEL = "nomic-embed-text"
 OLLAMA_URL = "http://localhost:11434"
+COLLECTION_NAME = "amazon_reviews"
+
+# ---------------- PIPELINE CONFIG ----------------
+# Optional row cap for quick experiments (None = full dataset)
+MAX_ROWS = None
+# Chunks per Ollama /api/embed request
+EMBED_BATCH = 64
+# Concurrent embed requests (match OLLAMA_NUM_PARALLEL)
+CONCURRENCY = 4
+# Embedded batches allowed to wait for the writer before we stop reading
+MAX_IN_FLIGHT = CONCURRENCY * 2
+# Ids per Chroma delete call
+WRITE_BATCH = 1000
+# Append written reviews to the manifest journal every N batches
+CHECKPOINT_EVERY = 20
+
+splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=50)
+
+# ---------------- MANIFEST ----------------
+def content_hash(product, brand, review_text):
+    payload = "\x1f".join([str(product), str(brand), str(review_text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_manifest():
+    # Last compacted manifest with the journal replayed on top
+    if not os.path.exists(MANIFEST_PATH) and not os.path.exists(JOURNAL_PATH):
+        return None
+    manifest = {}
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            manifest = json.load(f)
+    if os.path.exists(JOURNAL_PATH):
+        with open(JOURNAL_PATH, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rid, entry = json.loads(line)
+                except ValueError:
+                    # Torn line from an interrupted append: those reviews
+                    # are simply re-embedded
+                    continue
+                if entry is None:
+                    manifest.pop(rid, None)
+                else:
+                    manifest[rid] = entry
+    return manifest
+
+def append_journal(updates=None, removed=()):
+    # Checkpoints cost O(changes), not O(manifest)
+    os.makedirs(CHROMA_DIR, exist_ok=True)
+    with open(JOURNAL_PATH, "a", encoding="utf-8") as f:
+        for rid in removed:
+            f.write(json.dumps([rid, None]) + "\n")
+        for rid, entry in (updates or {}).items():
+            f.write(json.dumps([rid, entry]) + "\n")
+
+def save_manifest(manifest):
+    # Compaction: full rewrite, then the journal is no longer needed
+    os.makedirs(CHROMA_DIR, exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, MANIFEST_PATH)
+    if os.path.exists(JOURNAL_PATH):
+        os.remove(JOURNAL_PATH)
 
-df = pd.read_csv(CLEAN_PATH).head(10000)
+def chunk_ids(review_id, count):
+    return [f"{review_id}_{i:03d}" for i in range(count)]
 
-documents = []
+# ---------------- DOCUMENTS ----------------
+def split_review(review_id, product, brand, review_text):
+    texts = splitter.split_text(review_text)
+    metadata = {"review_id": review_id, "product": product, "brand": brand}
+    return texts, [dict(metadata) for _ in texts]
 
-for idx, row in df.iterrows():
-    review_id = f"rev_{idx:08d}"
+def iter_embed_batches(current, review_ids, batch_size=EMBED_BATCH):
+    # Batches always hold whole reviews so a review is either fully
+    # written or not at all when the manifest is checkpointed
+    batch = {"ids": [], "texts": [], "metadatas": [], "reviews": {}}
+    for rid in review_ids:
+        h, product, brand, review_text = current[rid]
+        texts, metadatas = split_review(rid, product, brand, review_text)
+        batch["ids"].extend(chunk_ids(rid, len(texts)))
+        batch["texts"].extend(texts)
+        batch["metadatas"].extend(metadatas)
+        batch["reviews"][rid] = {"hash": h, "chunks": len(texts)}
+        if len(batch["texts"]) >= batch_size:
+            yield batch
+            batch = {"ids": [], "texts": [], "metadatas": [], "reviews": {}}
+    if batch["reviews"]:
+        yield batch
 
-    documents.append(
-        Document(
-            page_content=row["review_text"],
-            metadata={
-                "review_id": review_id,
-                "product": row["product"],
-                "brand": row["brand"]
-            }
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def get_collection():
+    client = chromadb.PersistentClient(path=CHROMA_DIR)
+    return client.get_or_create_collection(name=COLLECTION_NAME)
+
+# ---------------- EMBED + WRITE ----------------
+def embed_and_write(collection, embedding, batches, manifest,
+                    concurrency=CONCURRENCY, max_in_flight=MAX_IN_FLIGHT):
+    started = time.perf_counter()
+    written = {"batches": 0, "chunks": 0}
+    pending = {}
+
+    def embed(batch):
+        batch["embeddings"] = embedding.embed_documents(batch["texts"])
+        return batch
+
+    def write(batch):
+        # Single writer thread: Chroma sees bounded, sequential upserts
+        collection.upsert(
+            ids=batch["ids"],
+            documents=batch["texts"],
+            metadatas=batch["metadatas"],
+            embeddings=batch["embeddings"]
         )
-    )
+        manifest.update(batch["reviews"])
+        pending.update(batch["reviews"])
+        written["batches"] += 1
+        written["chunks"] += len(batch["ids"])
+        if written["batches"] % CHECKPOINT_EVERY == 0:
+            append_journal(pending)
+            pending.clear()
+            elapsed = time.perf_counter() - started
+            print(f"⏱️  {written['chunks']} chunks — {written['chunks'] / elapsed:,.0f} chunks/sec")
 
-splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=50)
-docs = splitter.split_documents(documents)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = set()
+        for batch in batches:
+            # Backpressure: stop reading until the writer catches up
+            while len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for f in done:
+                    write(f.result())
+            in_flight.add(pool.submit(embed, batch))
+
+        for f in in_flight:
+            write(f.result())
 
-if os.path.exists(CHROMA_DIR):
-    shutil.rmtree(CHROMA_DIR)
+    append_journal(pending)
+    return written["chunks"]
 
-embedding = OllamaEmbeddings(model=EMBED_MODEL, base_url=OLLAMA_URL)
+# ---------------- BUILD ----------------
+def review_entries(df):
+    # review_id -> (content hash, product, brand, review_text)
+    return {
+        f"rev_{idx:08d}": (content_hash(product, brand, text), product, brand, text)
+        for idx, product, brand, text in zip(
+            df.index, df["product"], df["brand"], df["review_text"]
+        )
+    }
+
+def changed_reviews(current, manifest):
+    return [
+        rid for rid, entry in current.items()
+        if manifest.get(rid, {}).get("hash") != entry[0]
+    ]
+
+def drop_stale(collection, manifest, review_ids):
+    # Forget dropped reviews in the manifest too, so an interrupted run
+    # re-embeds them on resume
+    stale, forgotten = [], []
+    for rid in review_ids:
+        if rid in manifest:
+            stale.extend(chunk_ids(rid, manifest.pop(rid)["chunks"]))
+            forgotten.append(rid)
+    if forgotten:
+        append_journal(removed=forgotten)
+    for ids in _batched(stale, WRITE_BATCH):
+        collection.delete(ids=ids)
+    return len(stale)
+
+def open_index(incremental=True):
+    manifest = load_manifest()
+    if os.path.exists(IN_PROGRESS_PATH) and manifest is not None:
+        print("🔁 Resuming interrupted build from checkpoint")
+    elif not incremental or manifest is None:
+        # Full rebuild: nothing on disk can be trusted without a manifest
+        if os.path.exists(CHROMA_DIR):
+            shutil.rmtree(CHROMA_DIR)
+        manifest = {}
+
+    os.makedirs(CHROMA_DIR, exist_ok=True)
+    open(IN_PROGRESS_PATH, "w").close()
+
+    return get_collection(), manifest
+
+def close_index(collection, manifest, seen):
+    # Reviews missing from this run's data are gone from the source
+    removed = [rid for rid in manifest if rid not in seen]
+    deleted = drop_stale(collection, manifest, removed)
+    save_manifest(manifest)
+    os.remove(IN_PROGRESS_PATH)
+    bump_version("vector")
+    return len(removed), deleted
+
+def get_embedding():
+    return cached_ollama_embeddings(EMBED_MODEL, base_url=OLLAMA_URL)
+
+def build_chroma(incremental=True, max_rows=MAX_ROWS):
+    df = read_cleaned(columns=["product", "brand", "review_text"])
+    if max_rows:
+        df = df.head(max_rows)
+
+    current = review_entries(df)
+    collection, manifest = open_index(incremental)
+    embedding = get_embedding()
+
+    changed = changed_reviews(current, manifest)
+    print(f"📊 Reviews: {len(current)} | new/changed: {len(changed)}")
+
+    deleted = drop_stale(collection, manifest, changed)
+
+    embedded = embed_and_write(
+        collection, embedding, iter_embed_batches(current, changed), manifest
+    )
 
-vectorstore = Chroma.from_documents(
-    docs,
-    embedding=embedding,
-    persist_directory=CHROMA_DIR,
-    collection_name="amazon_reviews"
-)
+    removed, deleted_removed = close_index(collection, manifest, current)
+    print(f"Chroma embeddings updated successfully ({embedded} chunks embedded, "
+          f"{deleted + deleted_removed} deleted, {removed} reviews removed)")
+    print(f"🗃️  Embedding cache: {embedding.hits} hits, {embedding.misses} misses")
 
-print("Chroma embeddings created successfully")
+if __name__ == "__main__":
+    build_chroma(incremental="--full" not in sys.argv)
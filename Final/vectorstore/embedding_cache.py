@@ -0,0 +1,142 @@
+#embedding_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CACHE_PATH = os.path.join(BASE_DIR, "vectorstore", "embedding_cache.sqlite")
+
+# Max cached vectors (768-d float32 ≈ 3 KB each → ~3 GB at 1M)
+MAX_ENTRIES = 1_000_000
+# Evict down to this fraction of MAX_ENTRIES when the cap is hit
+EVICT_TO = 0.9
+# SQLite bound-parameter limit is 999 on older builds
+LOOKUP_BATCH = 500
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+class CachedEmbeddings(Embeddings):
+    # Wraps any LangChain embeddings with a persistent SQLite cache keyed
+    # by (model name, sha256(text)), with least-recently-used eviction
+
+    def __init__(self, embeddings, model_name, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # ---------------- STORE ----------------
+    def _lookup(self, keys):
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                part = keys[start:start + LOOKUP_BATCH]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({marks})",
+                    [self.model_name, *part]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model_name, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, items):
+        now = time.time()
+        with self._lock:
+            self._count += len(items)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [(self.model_name, key, array("f", vec).tobytes(), now) for key, vec in items]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # _count is an upper bound (INSERT OR REPLACE may overwrite), so
+        # only pay for an exact COUNT(*) once it crosses the cap
+        if self._count <= self.max_entries:
+            return
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - int(self.max_entries * EVICT_TO)
+        self._conn.execute("""
+            DELETE FROM embeddings WHERE (model, text_hash) IN (
+                SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?
+            )
+        """, (excess,))
+        self._count -= excess
+
+    # ---------------- EMBEDDINGS API ----------------
+    def embed_documents(self, texts):
+        keys = [text_hash(t) for t in texts]
+        found = self._lookup(list(set(keys)))
+
+        # Embed each distinct missing text once ("Great phone" x 1000)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        key = text_hash(text)
+        found = self._lookup([key])
+        if key in found:
+            self.hits += 1
+            return found[key]
+
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self._store([(key, vector)])
+        return vector
+
+def cached_ollama_embeddings(model, base_url=None, **kwargs):
+    kw = {"base_url": base_url} if base_url else {}
+    return CachedEmbeddings(OllamaEmbeddings(model=model, **kw), model, **kwargs)
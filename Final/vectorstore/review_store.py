@@ -0,0 +1,192 @@
+#review_store.py
+import os
+import sys
+import json
+import shutil
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(BASE_DIR)
+from offline.versions import bump_version, read_version
+
+STORE_DIR = os.path.join(BASE_DIR, "vectorstore", "review_store")
+
+# Row i holds review rev_{i:08d}; brand/product are codes into meta.json.
+# Positions only mean something for the cleaned data the store was built
+# from, so meta.json records that dataset's "cleaned" version.
+RECORD_DTYPE = np.dtype([
+    ("rating", "i1"),
+    ("votes", "i4"),
+    ("price", "f8"),
+    ("brand", "i4"),
+    ("product", "i4"),
+])
+
+NUMERIC_FILE = "numeric.bin"
+OFFSETS_FILE = "offsets.bin"
+TEXT_FILE = "text.bin"
+META_FILE = "meta.json"
+
+def review_index(review_id):
+    return int(review_id[len("rev_"):])
+
+# ---------------- WRITE ----------------
+class ReviewStoreWriter:
+    # Appends cleaned record batches in review_id order, then swaps the
+    # finished store into place so readers never see a partial build
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self.tmp = path + ".tmp"
+        if os.path.exists(self.tmp):
+            shutil.rmtree(self.tmp)
+        os.makedirs(self.tmp)
+
+        self.count = 0
+        self.text_size = 0
+        self.cleaned_version = read_version("cleaned")
+        self.vocab = {"brands": {}, "products": {}}
+        self._numeric = open(os.path.join(self.tmp, NUMERIC_FILE), "wb")
+        self._offsets = open(os.path.join(self.tmp, OFFSETS_FILE), "wb")
+        self._text = open(os.path.join(self.tmp, TEXT_FILE), "wb")
+        self._offsets.write(np.zeros(1, dtype="i8").tobytes())
+
+    def _code(self, kind, value):
+        codes = self.vocab[kind]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def append(self, df):
+        if len(df) and df.index[0] != self.count:
+            raise ValueError(f"review store expects row {self.count}, got {df.index[0]}")
+
+        records = np.zeros(len(df), dtype=RECORD_DTYPE)
+        records["rating"] = df["rating"].to_numpy()
+        records["votes"] = df["votes"].to_numpy()
+        records["price"] = df["price"].astype("float64").to_numpy(na_value=np.nan)
+        records["brand"] = [self._code("brands", b) for b in df["brand"]]
+        records["product"] = [self._code("products", p) for p in df["product"]]
+
+        blobs = [str(t).encode("utf-8") for t in df["review_text"]]
+        offsets = self.text_size + np.cumsum([len(b) for b in blobs], dtype="i8")
+
+        self._numeric.write(records.tobytes())
+        self._offsets.write(offsets.tobytes())
+        self._text.write(b"".join(blobs))
+
+        self.count += len(df)
+        if len(offsets):
+            self.text_size = int(offsets[-1])
+
+    def close(self):
+        for f in (self._numeric, self._offsets, self._text):
+            f.close()
+
+        with open(os.path.join(self.tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "count": self.count,
+                "cleaned_version": self.cleaned_version,
+                "brands": list(self.vocab["brands"]),
+                "products": list(self.vocab["products"])
+            }, f)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self.tmp, self.path)
+        bump_version("vector")
+
+def build_review_store(df=None, batch_size=50_000):
+    if df is None:
+        from offline.clean_data import read_cleaned
+        df = read_cleaned()
+
+    writer = ReviewStoreWriter()
+    for start in range(0, len(df), batch_size):
+        writer.append(df.iloc[start:start + batch_size])
+    writer.close()
+    print(f"✅ Review store built: {writer.count} reviews, {writer.text_size / 1e6:.1f} MB text")
+
+# ---------------- READ ----------------
+class ReviewStore:
+    # Memory-mapped, O(1) lookup by review_id; reopens after a rebuild
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._opened_at = None
+        self._data = None
+        self._warned = None
+
+    def _open(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+
+        stamp = os.path.getmtime(meta_path)
+        if self._data is not None and self._opened_at == stamp:
+            return self._data
+
+        with self._lock:
+            if self._data is None or self._opened_at != stamp:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                count = meta["count"]
+                self._data = {
+                    "count": count,
+                    "cleaned_version": meta.get("cleaned_version"),
+                    "brands": meta["brands"],
+                    "products": meta["products"],
+                    "numeric": np.memmap(os.path.join(self.path, NUMERIC_FILE),
+                                         dtype=RECORD_DTYPE, mode="r", shape=(count,)),
+                    "offsets": np.memmap(os.path.join(self.path, OFFSETS_FILE),
+                                         dtype="i8", mode="r", shape=(count + 1,)),
+                    "text": np.memmap(os.path.join(self.path, TEXT_FILE),
+                                      dtype="u1", mode="r")
+                } if count else None
+                self._opened_at = stamp
+        return self._data
+
+    def _current(self):
+        # None when the cleaned data was rebuilt after the store: row i
+        # would then be some other review
+        data = self._open()
+        if data is None:
+            return None
+        version = read_version("cleaned")
+        if data["cleaned_version"] != version:
+            if self._warned != version:
+                self._warned = version
+                print("Review store is stale (cleaned data changed); rebuild it with offline/ingest.py")
+            return None
+        return data
+
+    def get(self, review_id):
+        data = self._current()
+        if data is None:
+            return None
+
+        i = review_index(review_id)
+        if not 0 <= i < data["count"]:
+            return None
+
+        rec = data["numeric"][i]
+        start, end = data["offsets"][i], data["offsets"][i + 1]
+        price = float(rec["price"])
+        return {
+            "review_id": review_id,
+            "brand": data["brands"][rec["brand"]],
+            "product": data["products"][rec["product"]],
+            "rating": int(rec["rating"]),
+            "votes": int(rec["votes"]),
+            "price": None if np.isnan(price) else price,
+            "review_text": data["text"][start:end].tobytes().decode("utf-8")
+        }
+
+    def get_many(self, review_ids):
+        return [self.get(rid) for rid in review_ids]
+
+if __name__ == "__main__":
+    build_review_store()
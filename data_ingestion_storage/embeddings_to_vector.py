@@ -14,6 +14,11 @@ COLLECTION_NAME = "product_reviews_embeddings"
 
 EMBED_MODEL = "all-MiniLM-L6-v2"
 
+# Streaming mode
+PAGE_SIZE = 5000        # reviews fetched per Neo4j round trip
+ENCODE_BATCH = 64       # SentenceTransformer batch size
+CHROMA_BATCH = 5000     # below Chroma's max batch size (~5461)
+
 # =========================
 # CONNECT TO NEO4J
 # =========================
@@ -37,6 +42,34 @@ def fetch_reviews():
     with driver.session() as session:
         return [row.data() for row in session.run(query)]
 
+# =========================
+# STREAM DATA FROM NEO4J (keyset pagination)
+# =========================
+def iter_reviews(page_size=PAGE_SIZE):
+    query = """
+    MATCH (p:Product)-[:HAS_REVIEW]->(r:Review)-[:HAS_BRAND|OF_BRAND*0..1]->(b:Brand)
+    WHERE r.id > $after
+    RETURN
+        r.id AS review_key,
+        p.name AS product,
+        b.name AS brand,
+        r.text AS review,
+        r.rating AS rating
+    ORDER BY r.id
+    LIMIT $page_size
+    """
+    with driver.session() as session:
+        # Ordered seek on r.id instead of SKIP, so every page costs the same
+        session.run("CREATE INDEX review_uuid IF NOT EXISTS FOR (r:Review) ON (r.id)").consume()
+
+        after = ""
+        while True:
+            page = [row.data() for row in session.run(query, after=after, page_size=page_size)]
+            if not page:
+                return
+            yield page
+            after = page[-1]["review_key"]
+
 # =========================
 # BUILD EMBEDDING TEXT
 # =========================
@@ -53,10 +86,6 @@ Review: {row['review']}
 # =========================
 if __name__ == "__main__":
 
-    print("🔹 Loading data from Neo4j...")
-    rows = fetch_reviews()
-    print(f"🔹 Total reviews fetched: {len(rows)}")
-
     # Load embedding model
     model = SentenceTransformer(EMBED_MODEL)
 
@@ -64,32 +93,33 @@ if __name__ == "__main__":
     client = chromadb.PersistentClient(path=CHROMA_PATH)
     collection = client.get_or_create_collection(name=COLLECTION_NAME)
 
-    documents = []
-    embeddings = []
-    metadatas = []
-    ids = []
-
-    for i, row in enumerate(rows):
-        text = build_embedding_text(row)
-        vector = model.encode(text).tolist()
+    print("🔹 Streaming reviews from Neo4j...")
+    first_id = None
+    total = 0
 
-        documents.append(text)
-        embeddings.append(vector)
-        ids.append(f"review_{i}")
-
-        metadatas.append({
+    for rows in iter_reviews():
+        documents = [build_embedding_text(row) for row in rows]
+        embeddings = model.encode(documents, batch_size=ENCODE_BATCH).tolist()
+        page_ids = [f"review_{total + i}" for i in range(len(rows))]
+        metadatas = [{
             "product": row["product"],
             "brand": row["brand"],
             "rating": int(row["rating"])
-        })
-
-    # Store ALL embeddings (NO LIMIT)
-    collection.add(
-        documents=documents,
-        embeddings=embeddings,
-        metadatas=metadatas,
-        ids=ids
-    )
+        } for row in rows]
+
+        # Bounded writes; memory stays at one page regardless of corpus size
+        for start in range(0, len(rows), CHROMA_BATCH):
+            end = start + CHROMA_BATCH
+            collection.add(
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                ids=page_ids[start:end]
+            )
+
+        first_id = first_id or page_ids[0]
+        total += len(rows)
+        print(f"🔹 Embedded {total} reviews")
 
     print(f"✅ Stored {collection.count()} embeddings in ChromaDB")
 
@@ -97,7 +127,7 @@ if __name__ == "__main__":
     # PROOF: VIEW ONE VECTOR
     # =========================
     sample = collection.get(
-        ids=[ids[0]],
+        ids=[first_id],
         include=["documents", "metadatas", "embeddings"]
     )
 